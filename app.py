@@ -18,4 +18,6 @@ from maqro_backend.main import app
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port) 
\ No newline at end of file
+    # uvloop + httptools ship with uvicorn[standard]; pin them so a missing
+    # extra fails loudly instead of silently falling back to asyncio/h11
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools") 
\ No newline at end of file
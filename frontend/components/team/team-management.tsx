@@ -200,6 +200,7 @@ export function TeamManagement() {
       const api = await getAuthenticatedApi()
       const result = await api.post<{
         success: boolean
+        queued?: boolean
         message?: string
         error?: string
         invite_link?: string
@@ -26,6 +26,7 @@ export interface InviteListResponse {
   created_at: string;
   expires_at: string;
   status: string;
+  inviter_name?: string | null;
 }
 
 export interface InviteAccept {
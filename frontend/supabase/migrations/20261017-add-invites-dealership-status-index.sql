@@ -0,0 +1,14 @@
+-- Migration: Add composite index for dealership invite listings
+-- Date: 2026-10-17
+-- Description: Backs GET /invites, which filters invites by dealership (optionally by status)
+-- and orders them newest first. The existing idx_invites_dealership_email index cannot
+-- serve the ORDER BY, so every listing sorted all of the dealership's invite rows.
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this migration intentionally has no BEGIN/COMMIT.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invites_dealership_status_created
+  ON public.invites (dealership_id, status, created_at DESC);
+
+-- Refresh planner statistics so the new index is picked up immediately
+ANALYZE public.invites;
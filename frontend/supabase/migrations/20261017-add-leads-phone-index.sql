@@ -0,0 +1,18 @@
+-- Migration: Add index for lead lookups by phone number
+-- Date: 2026-10-17
+-- Description: Backs inbound SMS routing. Every message resolves its dealership with
+-- SELECT dealership_id FROM leads WHERE phone = ? and then loads the lead with
+-- WHERE phone = ? AND dealership_id = ?. leads had no index on phone, so both were
+-- sequential scans. Phones are already normalized by the backend before they are
+-- stored, so no separate normalized column is needed; with dealership_id as the
+-- second key the dealership lookup is an index-only scan.
+--
+-- NOTE: CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+-- so this migration intentionally has no BEGIN/COMMIT.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_phone_dealership
+  ON public.leads (phone, dealership_id)
+  WHERE phone IS NOT NULL;
+
+-- Refresh planner statistics so the new index is picked up immediately
+ANALYZE public.leads;
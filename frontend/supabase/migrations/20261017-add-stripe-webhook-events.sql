@@ -0,0 +1,28 @@
+-- Migration: Store raw Stripe webhook events before acknowledging them
+-- Date: 2026-10-17
+-- Description: The Stripe webhook acks as soon as the event is stored here and applies it
+-- in the background. A row with processed_at NULL is an event that still has to be applied
+-- (worker restart, DB error, deploy); the backend retries those periodically, so an
+-- acknowledged billing event is never lost. The primary key also de-duplicates redeliveries.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.stripe_webhook_events (
+  stripe_event_id text PRIMARY KEY,
+  event_type text NOT NULL,
+  payload jsonb NOT NULL,
+  received_at timestamp with time zone NOT NULL DEFAULT now(),
+  processed_at timestamp with time zone,
+  attempts integer NOT NULL DEFAULT 0,
+  last_error text
+);
+
+-- Backs the retry sweep, which only ever looks at unprocessed events
+CREATE INDEX IF NOT EXISTS idx_stripe_webhook_events_pending
+  ON public.stripe_webhook_events (received_at)
+  WHERE processed_at IS NULL;
+
+-- Backend-only table: no policies, so only the service role can read or write it
+ALTER TABLE public.stripe_webhook_events ENABLE ROW LEVEL SECURITY;
+
+COMMIT;
@@ -81,12 +81,17 @@ class JWTBearer(HTTPBearer):
             )
             
         logger.info("🔍 Validating JWT token...")
-        if not self.verify_jwt(credentials.credentials):
+        try:
+            payload = _decode_jwt_payload(credentials.credentials)
+        except HTTPException:
             logger.error("❌ JWT token validation failed")
             raise HTTPException(
                 status_code=401, 
                 detail="Invalid or expired token"
             )
+        
+        # Keep the verified claims so dependencies don't decode the token again
+        request.state.jwt_payload = payload
             
         logger.info("✅ JWT token validation successful")
         return credentials.credentials
@@ -103,10 +108,22 @@ class JWTBearer(HTTPBearer):
 def decode_jwt_token(token: str) -> dict:
     return _decode_jwt_payload(token)
 
-async def get_current_user_id(token: str = Depends(JWTBearer())) -> str:
+
+# Single shared instance: FastAPI caches a dependency's result per request
+# by callable, so every dependency using this one verifies the token once
+jwt_bearer = JWTBearer()
+
+
+def _verified_payload(request: Request, token: str) -> dict:
+    """Claims verified by jwt_bearer for this request, decoding only as a fallback."""
+    payload = getattr(request.state, "jwt_payload", None)
+    return payload if payload is not None else decode_jwt_token(token)
+
+
+async def get_current_user_id(request: Request, token: str = Depends(jwt_bearer)) -> str:
     logger.info("Extracting user ID from validated JWT token")
     
-    payload = decode_jwt_token(token)
+    payload = _verified_payload(request, token)
     user_id = payload.get("sub")
     
     if not user_id:
@@ -132,10 +149,6 @@ async def get_optional_user_id(
         return None
 
 
-async def get_user_email(token: str = Depends(JWTBearer())) -> None | str:
-    payload = decode_jwt_token(token)
-    return payload.get("email")
-
-
-# Legacy compatibility - for gradual migration
-jwt_bearer = JWTBearer()
\ No newline at end of file
+async def get_user_email(request: Request, token: str = Depends(jwt_bearer)) -> None | str:
+    payload = _verified_payload(request, token)
+    return payload.get("email")
\ No newline at end of file
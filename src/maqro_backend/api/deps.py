@@ -1,5 +1,5 @@
 from typing import Annotated, Optional
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -8,20 +8,60 @@ from ..db.session import get_db
 from ..core.lifespan import get_enhanced_rag_service
 from ..db.models import UserProfile
 from ..services.settings_service import SettingsService
+from ..services.profile_cache import CachedUserProfile, user_profile_cache
 from .auth import get_current_user_id, get_optional_user_id
+from dataclasses import fields
 import logging
 import uuid
-from sqlalchemy import text
 
 logger = logging.getLogger(__name__)
 
+# Roles allowed through manager-level permission checks
+MANAGER_ROLES = frozenset({"owner", "manager"})
+
+
+# user_profiles columns copied into the cached, session-independent profile
+_PROFILE_COLUMNS = [getattr(UserProfile, field.name) for field in fields(CachedUserProfile)]
+
 
 # Re-export for easy importing
 get_db_session = get_db
 get_enhanced_rag_services = get_enhanced_rag_service
 
 
+async def _load_user_profile(request: Request, user_id: str, db: AsyncSession) -> Optional[CachedUserProfile]:
+    """
+    Look up the caller's profile once per request, via the short-TTL cache.
+
+    Shared by the membership/role dependencies so a request resolves the
+    user's dealership and role with at most one query (none on a cache hit).
+    """
+    profile = getattr(request.state, "user_profile", None)
+    if profile is not None:
+        return profile
+
+    profile = user_profile_cache.get(user_id)
+    if profile is None:
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=401, detail="Invalid user ID")
+        # Plain columns, not the entity: the cached copy must not belong to this session
+        result = await db.execute(
+            select(*_PROFILE_COLUMNS).where(UserProfile.user_id == user_uuid)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        profile = CachedUserProfile(**row._mapping)
+        user_profile_cache.set(user_id, profile)
+
+    request.state.user_profile = profile
+    return profile
+
+
 async def get_user_dealership_id(
+    request: Request,
     user_id: str = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db_session)
 ) -> str:
@@ -29,9 +69,11 @@ async def get_user_dealership_id(
     Extract user's dealership ID from their profile.
     
     This function gets the user ID from the JWT token and then looks up
-    their dealership_id from the user_profiles table.
+    their dealership_id from the user_profiles table (cached, see
+    ``_load_user_profile``).
     
     Args:
+        request: Current request (holds the per-request profile memo)
         user_id: User ID from JWT token (via get_current_user_id dependency)
         db: Database session
         
@@ -41,29 +83,10 @@ async def get_user_dealership_id(
     Raises:
         HTTPException: If user profile is missing or dealership_id is null
     """
-    logger.info("🏢 Fetching user's dealership ID from profile")
-    
-    # Look up their profile to get dealership_id
     try:
-        # Use raw SQL with UUID-typed bind parameter to avoid ORM mapper initialization issues
-        user_uuid = uuid.UUID(user_id)
-        result = await db.execute(
-            text("SELECT dealership_id FROM user_profiles WHERE user_id = :user_id"),
-            {"user_id": user_uuid}
-        )
-        row = result.fetchone()
-        dealership_id = row[0] if row else None
-        
-        if not dealership_id:
-            logger.error(f"❌ No dealership found for user {user_id}")
-            raise HTTPException(
-                status_code=403, 
-                detail="User profile not found or not associated with a dealership"
-            )
-        
-        logger.info(f"✅ Found dealership ID: {dealership_id} for user: {user_id}")
-        return str(dealership_id)
-        
+        profile = await _load_user_profile(request, user_id, db)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Database error fetching dealership for user {user_id}: {str(e)}")
         raise HTTPException(
@@ -71,6 +94,15 @@ async def get_user_dealership_id(
             detail="Error fetching user dealership information"
         )
 
+    if profile is None or not profile.dealership_id:
+        logger.error(f"❌ No dealership found for user {user_id}")
+        raise HTTPException(
+            status_code=403, 
+            detail="User profile not found or not associated with a dealership"
+        )
+
+    return str(profile.dealership_id)
+
 
 async def get_optional_user_dealership_id(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
@@ -114,7 +146,14 @@ async def get_optional_user_dealership_id(
 
 
 # New permission-based dependencies for settings system
+async def _get_user_role(request: Request, user_id: str, db: AsyncSession) -> Optional[str]:
+    """Role of a user whose dealership was already resolved by get_user_dealership_id."""
+    profile = await _load_user_profile(request, user_id, db)
+    return profile.role if profile is not None else None
+
+
 async def require_dealership_manager(
+    request: Request,
     user_id: str = Depends(get_current_user_id),
     dealership_id: str = Depends(get_user_dealership_id),
     db: AsyncSession = Depends(get_db_session)
@@ -129,39 +168,20 @@ async def require_dealership_manager(
     Raises:
         HTTPException: If user doesn't have manager+ permissions
     """
-    # Query user's role from user_profiles table
-    try:
-        user_uuid = uuid.UUID(user_id)
-        dealership_uuid = uuid.UUID(dealership_id)
-
-        result = await db.execute(
-            text("SELECT role FROM user_profiles WHERE user_id = :user_id AND dealership_id = :dealership_id"),
-            {"user_id": user_uuid, "dealership_id": dealership_uuid}
-        )
-        row = result.fetchone()
-        user_role = row[0] if row else None
-
-        if not user_role or user_role.lower() not in ['owner', 'manager']:
-            logger.warning(f"❌ User {user_id} denied manager access (role: {user_role})")
-            raise HTTPException(
-                status_code=403,
-                detail="Insufficient permissions. Manager or owner role required."
-            )
+    user_role = await _get_user_role(request, user_id, db)
 
-        logger.info(f"✅ User {user_id} granted manager access (role: {user_role})")
-        return user_id
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Error checking permissions for user {user_id}: {e}")
+    if not user_role or user_role.lower() not in MANAGER_ROLES:
+        logger.warning(f"❌ User {user_id} denied manager access (role: {user_role})")
         raise HTTPException(
-            status_code=500,
-            detail="Error checking user permissions"
+            status_code=403,
+            detail="Insufficient permissions. Manager or owner role required."
         )
 
+    return user_id
+
 
 async def require_dealership_owner(
+    request: Request,
     user_id: str = Depends(get_current_user_id),
     dealership_id: str = Depends(get_user_dealership_id),
     db: AsyncSession = Depends(get_db_session)
@@ -176,39 +196,20 @@ async def require_dealership_owner(
     Raises:
         HTTPException: If user doesn't have owner permissions
     """
-    # Query user's role from user_profiles table
-    try:
-        user_uuid = uuid.UUID(user_id)
-        dealership_uuid = uuid.UUID(dealership_id)
-
-        result = await db.execute(
-            text("SELECT role FROM user_profiles WHERE user_id = :user_id AND dealership_id = :dealership_id"),
-            {"user_id": user_uuid, "dealership_id": dealership_uuid}
-        )
-        row = result.fetchone()
-        user_role = row[0] if row else None
+    user_role = await _get_user_role(request, user_id, db)
 
-        if not user_role or user_role.lower() != 'owner':
-            logger.warning(f"❌ User {user_id} denied owner access (role: {user_role})")
-            raise HTTPException(
-                status_code=403,
-                detail="Insufficient permissions. Owner role required."
-            )
-
-        logger.info(f"✅ User {user_id} granted owner access (role: {user_role})")
-        return user_id
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Error checking permissions for user {user_id}: {e}")
+    if not user_role or user_role.lower() != 'owner':
+        logger.warning(f"❌ User {user_id} denied owner access (role: {user_role})")
         raise HTTPException(
-            status_code=500,
-            detail="Error checking user permissions"
+            status_code=403,
+            detail="Insufficient permissions. Owner role required."
         )
 
+    return user_id
+
 
 async def get_user_role_info(
+    request: Request,
     user_id: str = Depends(get_current_user_id),
     dealership_id: str = Depends(get_user_dealership_id),
     db: AsyncSession = Depends(get_db_session)
@@ -223,37 +224,85 @@ async def get_user_role_info(
     Raises:
         HTTPException: If user has no role in the dealership
     """
-    # Query user's role from user_profiles table
-    try:
-        user_uuid = uuid.UUID(user_id)
-        dealership_uuid = uuid.UUID(dealership_id)
+    role_name = await _get_user_role(request, user_id, db)
 
-        result = await db.execute(
-            text("SELECT role FROM user_profiles WHERE user_id = :user_id AND dealership_id = :dealership_id"),
-            {"user_id": user_uuid, "dealership_id": dealership_uuid}
+    if not role_name:
+        logger.error(f"❌ User {user_id} has no role in dealership {dealership_id}")
+        raise HTTPException(
+            status_code=403,
+            detail="User has no role assigned in this dealership"
         )
-        row = result.fetchone()
-        role_name = row[0] if row else None
 
-        if not role_name:
-            logger.error(f"❌ User {user_id} has no role in dealership {dealership_id}")
-            raise HTTPException(
-                status_code=403,
-                detail="User has no role assigned in this dealership"
-            )
+    return user_id, dealership_id, role_name
 
-        logger.info(f"✅ Retrieved role info for user {user_id}: {role_name}")
-        return user_id, dealership_id, role_name
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Error getting role info for user {user_id}: {e}")
+async def get_current_user_profile(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db_session)
+) -> CachedUserProfile:
+    """
+    Get the authenticated user's profile, memoized per request and per user.
+
+    The profile is looked up at most once per request (stored on
+    ``request.state.user_profile``) and is served from a short-TTL
+    in-process cache on repeat requests from the same user.
+
+    Raises:
+        HTTPException: If the user has no profile
+    """
+    profile = await _load_user_profile(request, user_id, db)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="User profile not found")
+    return profile
+
+
+async def require_manager_or_owner(
+    profile: CachedUserProfile = Depends(get_current_user_profile)
+) -> CachedUserProfile:
+    """
+    Dependency that requires manager or owner role and returns the caller's profile.
+
+    Returns:
+        CachedUserProfile: The authenticated user's profile
+
+    Raises:
+        HTTPException: If the user has no dealership or lacks manager+ role
+    """
+    if not profile.dealership_id or profile.role not in MANAGER_ROLES:
+        logger.warning(f"❌ User {profile.user_id} denied manager access (role: {profile.role})")
         raise HTTPException(
-            status_code=500,
-            detail="Error retrieving user role information"
+            status_code=403,
+            detail="You need manager or owner permissions to perform this action"
         )
 
+    return profile
+
+
+async def require_owner(
+    profile: CachedUserProfile = Depends(get_current_user_profile)
+) -> CachedUserProfile:
+    """
+    Dependency that requires owner role and returns the caller's profile.
+
+    Replaces the get_user_dealership_id + require_dealership_owner pair with
+    the single (cached) profile lookup.
+
+    Returns:
+        CachedUserProfile: The authenticated user's profile
+
+    Raises:
+        HTTPException: If the user has no dealership or is not an owner
+    """
+    if not profile.dealership_id or profile.role != "owner":
+        logger.warning(f"❌ User {profile.user_id} denied owner access (role: {profile.role})")
+        raise HTTPException(
+            status_code=403,
+            detail="Insufficient permissions. Owner role required."
+        )
+
+    return profile
+
 
 # Service dependencies
 async def get_settings_service() -> SettingsService:
@@ -6,15 +6,13 @@ including conversation responses, general queries, and enhanced RAG integration.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime
-import pytz
+from datetime import datetime, timezone
 import logging
 from typing import Optional, Dict, Any
 
 from maqro_rag import EnhancedRAGService
+from maqro_backend.core.rate_limit import limiter
 from maqro_backend.api.deps import (
     get_db_session, 
     get_enhanced_rag_services, 
@@ -36,8 +34,6 @@ from ...services.ai_services import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
 router = APIRouter()
 
 
@@ -107,7 +103,6 @@ class AIResponseHandler:
     async def generate_general_response(
         self,
         request_data: GeneralAIRequest,
-        db: AsyncSession,
         user_id: str
     ) -> Dict[str, Any]:
         """
@@ -115,7 +110,6 @@ class AIResponseHandler:
         
         Args:
             request_data: General request data
-            db: Database session
             user_id: User ID
             
         Returns:
@@ -189,7 +183,7 @@ class AIResponseHandler:
                 lead_id=lead_id,
                 role="customer",
                 content=customer_message,
-                timestamp=datetime.now(pytz.UTC)
+                timestamp=datetime.now(timezone.utc)
             )
             
             await create_conversation(
@@ -197,7 +191,7 @@ class AIResponseHandler:
                 lead_id=lead_id,
                 role="agent",
                 content=ai_response,
-                timestamp=datetime.now(pytz.UTC)
+                timestamp=datetime.now(timezone.utc)
             )
         except Exception as e:
             logger.error(f"Error saving conversation turn: {e}")
@@ -214,7 +208,7 @@ class AIResponseHandler:
             "retrieval_score": response.get('retrieval_score', 0.0),
             "calendar_booking": response.get('calendar_booking'),
             "lead_id": lead_id,
-            "timestamp": datetime.now(pytz.UTC).isoformat()
+            "timestamp": datetime.now(timezone.utc).isoformat()
         }
 
 
@@ -249,7 +243,6 @@ async def generate_conversation_ai_response(
 async def generate_general_ai_response(
     request: Request,
     request_data: GeneralAIRequest,
-    db: AsyncSession = Depends(get_db_session),
     enhanced_rag_service: EnhancedRAGService = Depends(get_enhanced_rag_services),
     user_id: str = Depends(get_current_user_id)
 ):
@@ -263,7 +256,6 @@ async def generate_general_ai_response(
     handler = AIResponseHandler(enhanced_rag_service)
     return await handler.generate_general_response(
         request_data=request_data,
-        db=db,
         user_id=user_id
     )
 
@@ -273,7 +265,6 @@ async def generate_general_ai_response(
 async def generate_enhanced_ai_response(
     request: Request,
     request_data: GeneralAIRequest,
-    db: AsyncSession = Depends(get_db_session),
     enhanced_rag_service: EnhancedRAGService = Depends(get_enhanced_rag_services),
     user_id: str = Depends(get_current_user_id)
 ):
@@ -288,7 +279,6 @@ async def generate_enhanced_ai_response(
     handler = AIResponseHandler(enhanced_rag_service)
     return await handler.generate_general_response(
         request_data=request_data,
-        db=db,
         user_id=user_id
     )
 
@@ -305,7 +295,7 @@ async def ai_health_check():
         # Basic health check - could be enhanced with service-specific checks
         return {
             "status": "healthy",
-            "timestamp": datetime.now(pytz.UTC).isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
             "services": {
                 "enhanced_rag": "available",
                 "calendar_integration": "available",
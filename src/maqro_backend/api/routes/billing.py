@@ -30,20 +30,30 @@ async def get_current_subscription(
         """
     )
     result = await db.execute(q, {"dealership_id": dealership_id})
-    row = result.fetchone()
-    if not row or row.subscription_id is None:
+    row = result.first()
+    if not row or row[0] is None:
         return {"subscription": None}
 
+    (
+        subscription_id,
+        status,
+        current_period_start,
+        current_period_end,
+        plan_name,
+        plan_product_id,
+        monthly_price_cents,
+    ) = row.t
+
     return {
         "subscription": {
-            "id": str(row.subscription_id),
-            "status": row.status,
-            "current_period_start": row.current_period_start,
-            "current_period_end": row.current_period_end,
+            "id": str(subscription_id),
+            "status": status,
+            "current_period_start": current_period_start,
+            "current_period_end": current_period_end,
             "plan": {
-                "name": row.plan_name,
-                "product_id": row.plan_product_id,
-                "monthly_price_cents": row.monthly_price_cents,
+                "name": plan_name,
+                "product_id": plan_product_id,
+                "monthly_price_cents": monthly_price_cents,
             },
         }
     }
@@ -59,17 +69,17 @@ async def list_plans(db: AsyncSession = Depends(get_db_session)) -> Dict[str, An
         """
     )
     result = await db.execute(q)
-    rows = result.fetchall()
+    # Unpack plain tuples in SELECT order instead of going through Row attribute access
     plans = [
         {
-            "id": str(r.id),
-            "stripe_product_id": r.stripe_product_id,
-            "name": r.name,
-            "description": r.description,
-            "monthly_price_cents": r.monthly_price_cents,
-            "max_salespeople": r.max_salespeople,
+            "id": str(plan_id),
+            "stripe_product_id": stripe_product_id,
+            "name": name,
+            "description": description,
+            "monthly_price_cents": monthly_price_cents,
+            "max_salespeople": max_salespeople,
         }
-        for r in rows
+        for plan_id, stripe_product_id, name, description, monthly_price_cents, max_salespeople in result.tuples()
     ]
     return {"plans": plans}
 
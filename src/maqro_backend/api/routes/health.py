@@ -1,18 +1,22 @@
 """
 Health check and monitoring endpoints
 """
-from fastapi import APIRouter, Depends
+import orjson
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from maqro_backend.api.deps import get_db_session
 from maqro_backend.services.background_tasks import get_task_status, cleanup_background_tasks
 
 router = APIRouter()
 
+# Constant payload, serialized once at import for load-balancer polling
+_HEALTHY_JSON = orjson.dumps({"status": "healthy", "message": "Service is running"})
+
 
 @router.get("/health")
 async def health_check():
     """Basic health check endpoint"""
-    return {"status": "healthy", "message": "Service is running"}
+    return Response(content=_HEALTHY_JSON, media_type="application/json")
 
 
 @router.get("/health/db")
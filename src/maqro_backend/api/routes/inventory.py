@@ -2,14 +2,13 @@
 Inventory API routes for Supabase integration
 """
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import pandas as pd
 from io import BytesIO
 import re
 
+from maqro_backend.core.rate_limit import limiter
 from maqro_backend.api.deps import get_db_session, get_current_user_id, get_optional_user_id, get_user_dealership_id, get_optional_user_dealership_id
 from maqro_backend.schemas.inventory import InventoryCreate, InventoryResponse, InventoryUpdate
 from maqro_backend.crud import (
@@ -26,8 +25,6 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
 
 router = APIRouter()
 
@@ -1,35 +1,50 @@
 """
 Invite API routes for salesperson invitations
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional
+import asyncio
+import base64
 import logging
+import uuid
 
-from maqro_backend.api.deps import get_db_session, get_current_user_id, get_user_dealership_id, require_dealership_manager
+from maqro_backend.api.deps import get_db_session, get_current_user_id, require_manager_or_owner
+from maqro_backend.services.profile_cache import CachedUserProfile, user_profile_cache
+from maqro_backend.api.responses import ORJSONResponse
 from maqro_backend.schemas.invite import (
     InviteCreate, 
     InviteResponse, 
     InviteAccept,
+    InviteComplete,
     InviteListResponse,
+    BulkInviteCreate,
+    BulkInviteResponse,
     SendInviteEmailRequest
 )
 from maqro_backend.crud import (
     create_invite,
-    get_invite_by_token,
+    create_invites_bulk,
+    get_dealership_name,
+    claim_invite,
+    get_invite_with_dealership_by_token,
     get_invites_by_dealership,
     update_invite_status,
     create_user_profile
 )
 from maqro_backend.services.roles_service import RolesService
-from maqro_backend.crud import get_user_profile_by_user_id
-from sqlalchemy import select
+from maqro_backend.services.email_service import email_service
+from maqro_backend.db.models import Invite
 from maqro_backend.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Roles a manager or owner may hand out through an invite
+_ALLOWED_INVITE_ROLES = frozenset({"salesperson", "manager"})
+
 
 @router.get("/invites/verify", response_model=dict)
 async def verify_invite(
@@ -42,28 +57,11 @@ async def verify_invite(
     Returns dealership and role information if valid.
     """
     try:
-        invite = await get_invite_by_token(session=db, token=token)
+        row = await get_invite_with_dealership_by_token(session=db, token=token, valid_only=True)
 
-        if not invite:
-            return {"valid": False, "reason": "Invalid or expired invite token"}
-
-        # Check status and expiry
-        from datetime import datetime, timezone
-        if invite.status != "pending":
-            return {"valid": False, "reason": "Invite already used or cancelled"}
-        if invite.expires_at and invite.expires_at < datetime.now(timezone.utc):
-            return {"valid": False, "reason": "Invite has expired"}
-
-        # Get dealership name if available
-        dealership_name = ""
-        try:
-            from maqro_backend.db.models import Dealership
-            result = await db.execute(
-                select(Dealership.name).where(Dealership.id == invite.dealership_id)
-            )
-            dealership_name = result.scalar_one_or_none() or ""
-        except Exception:
-            dealership_name = ""
+        if not row:
+            return {"valid": False, "reason": "Invalid, used, or expired invite token"}
+        invite, dealership_name = row
 
         return {
             "valid": True,
@@ -74,122 +72,168 @@ async def verify_invite(
             "expires_at": invite.expires_at.isoformat() if invite.expires_at else None,
         }
     except Exception as e:
-        logger.error(f"Error verifying invite: {e}")
+        logger.error("Error verifying invite: %s", e)
         return {"valid": False, "reason": "Failed to verify invite token"}
 
 
+def _to_invite_response(invite: Invite) -> InviteResponse:
+    return InviteResponse(
+        id=invite.id,
+        dealership_id=invite.dealership_id,
+        email=invite.email,
+        token=invite.token_hash,
+        role_name=invite.role,
+        invited_by=invite.invited_by,
+        created_at=invite.created_at,
+        expires_at=invite.expires_at,
+        status=invite.status
+    )
+
+
 @router.post("/invites", response_model=InviteResponse)
 async def create_new_invite(
     invite_data: InviteCreate,
     db: AsyncSession = Depends(get_db_session),
-    user_id: str = Depends(get_current_user_id),
-    dealership_id: str = Depends(get_user_dealership_id)
+    current_user_profile: CachedUserProfile = Depends(require_manager_or_owner)
 ):
     """
     Create a new invite for a salesperson
     
     Requires manager or owner role.
     """
-    logger.info(f"Creating invite for email: {invite_data.email} by user: {user_id}")
+    logger.debug("Creating invite for email: %s by user: %s", invite_data.email, current_user_profile.user_id)
+    dealership_id = str(current_user_profile.dealership_id)
     
-    # Check if user has permission to create invites (manager or owner)
-    current_user_profile = await get_user_profile_by_user_id(session=db, user_id=user_id)
-    if not current_user_profile or current_user_profile.role not in ['owner', 'manager']:
+    # Only allow non-owner roles from the API to avoid privilege escalation
+    requested_role = invite_data.role_name
+    if requested_role not in _ALLOWED_INVITE_ROLES:
         raise HTTPException(
-            status_code=403, 
-            detail="You need manager or owner permissions to create invites"
+            status_code=400,
+            detail=f"Invalid role: {requested_role}. Allowed roles are: {', '.join(sorted(_ALLOWED_INVITE_ROLES))}"
         )
     
     try:
-        # Force all invites to salesperson role from the API to avoid privilege escalation
-        requested_role = invite_data.role_name
-        allowed_roles = ['salesperson', 'manager']
-
-        if requested_role not in allowed_roles:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid role: {requested_role}. Allowed roles are: {', '.join(allowed_roles)}"
-            )
-        
         invite = await create_invite(
             session=db,
             dealership_id=dealership_id,
             email=invite_data.email,
             role_name=requested_role,
-            invited_by=user_id,
+            invited_by=str(current_user_profile.user_id),
             expires_in_days=invite_data.expires_in_days
         )
         
-        logger.info(f"Invite created with ID: {invite.id}")
+        logger.info("Invite created with ID: %s", invite.id)
         
-        invite_response = InviteResponse(
-            id=str(invite.id),
-            dealership_id=str(invite.dealership_id),
-            email=invite.email,
-            token=invite.token_hash,
-            role_name=invite.role,
-            invited_by=str(invite.invited_by),
-            created_at=invite.created_at,
-            expires_at=invite.expires_at,
-            status=invite.status
+        return _to_invite_response(invite)
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error creating invite: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to create invite")
+
+
+@router.post("/invites/bulk", response_model=BulkInviteResponse)
+async def create_bulk_invites(
+    invite_data: BulkInviteCreate,
+    db: AsyncSession = Depends(get_db_session),
+    current_user_profile: CachedUserProfile = Depends(require_manager_or_owner)
+):
+    """
+    Create invites for several emails and send all invite emails concurrently
+    
+    Requires manager or owner role. At most MAX_BULK_INVITES emails per request.
+    Emails that already have a pending invite are reported in already_invited
+    instead of failing the whole batch.
+    """
+    if invite_data.role_name not in _ALLOWED_INVITE_ROLES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid role: {invite_data.role_name}. Allowed roles are: {', '.join(sorted(_ALLOWED_INVITE_ROLES))}"
         )
 
-        logger.info(f"📧 Invite created successfully for {invite.email}. Token: {invite.token_hash}")
+    logger.debug("Creating %d invites by user: %s", len(invite_data.emails), current_user_profile.user_id)
 
-        return invite_response
-        
+    try:
+        invites, already_invited = await create_invites_bulk(
+            session=db,
+            dealership_id=str(current_user_profile.dealership_id),
+            emails=invite_data.emails,
+            role_name=invite_data.role_name,
+            invited_by=str(current_user_profile.user_id),
+            expires_in_days=invite_data.expires_in_days
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error creating invite: {e}")
-        raise HTTPException(status_code=500, detail="Failed to create invite")
+        logger.error("Error creating bulk invites: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to create invites")
+
+    dealership_name = await get_dealership_name(
+        session=db, dealership_id=str(current_user_profile.dealership_id)
+    ) or "Unknown Dealership"
+    frontend_base = settings.frontend_base_url or "http://localhost:3000"
+
+    results = await asyncio.gather(
+        *[
+            email_service.send_invite_email(
+                email=invite.email,
+                invite_link=f"{frontend_base}/signup?token={invite.token_hash}",
+                dealership_name=dealership_name,
+                role_name=invite.role,
+                inviter_name=current_user_profile.full_name
+            )
+            for invite in invites
+        ],
+        return_exceptions=True
+    )
+    email_results = {
+        invite.email: isinstance(result, dict) and result.get("success", False)
+        for invite, result in zip(invites, results)
+    }
+
+    logger.info(
+        "Bulk invites created: %d, emails sent: %d, already invited: %d",
+        len(invites), sum(email_results.values()), len(already_invited)
+    )
+
+    return BulkInviteResponse(
+        invites=[_to_invite_response(invite) for invite in invites],
+        email_results=email_results,
+        already_invited=already_invited
+    )
 
 
 @router.post("/send-invite-email")
 async def send_invite_email(
     request: SendInviteEmailRequest,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db_session),
-    user_id: str = Depends(get_current_user_id)
+    current_user_profile: CachedUserProfile = Depends(require_manager_or_owner)
 ):
     """
-    Send invite email via Resend
+    Queue an invite email via Resend
     
-    Requires manager or owner role.
+    Requires manager or owner role. Returns as soon as the email is queued.
     """
-    logger.info(f"Sending invite email to: {request.email}")
-    
-    # Check if user has permission to send invites (manager or owner)
-    current_user_profile = await get_user_profile_by_user_id(session=db, user_id=user_id)
-    if not current_user_profile or current_user_profile.role not in ['owner', 'manager']:
-        raise HTTPException(
-            status_code=403, 
-            detail="You need manager or owner permissions to send invite emails"
-        )
+    logger.debug("Queueing invite email to: %s", request.email)
     
     try:
-        # Import ResendEmailService
-        from maqro_backend.services.email_service import ResendEmailService
-        
         # Get invite details to extract dealership and role info
-        invite = await get_invite_by_token(session=db, token=request.token)
-        if not invite:
+        row = await get_invite_with_dealership_by_token(session=db, token=request.token)
+        if not row:
             raise HTTPException(status_code=404, detail="Invalid invite token")
-        
-        # Get dealership name
-        from maqro_backend.db.models import Dealership
-        from sqlalchemy import select
-        dealership_result = await db.execute(
-            select(Dealership.name).where(Dealership.id == invite.dealership_id)
-        )
-        dealership_name = dealership_result.scalar_one_or_none() or "Unknown Dealership"
+        invite, dealership_name = row
+        dealership_name = dealership_name or "Unknown Dealership"
         
         # Build invite link
         frontend_base = settings.frontend_base_url or "http://localhost:3000"
         invite_link = f"{frontend_base}/signup?token={request.token}"
         
-        # Send email via Resend
-        email_service = ResendEmailService()
-        result = await email_service.send_invite_email(
+        # Send email via Resend after the response goes out; the service
+        # logs its own success/failure
+        background_tasks.add_task(
+            email_service.send_invite_email,
             email=request.email,
             invite_link=invite_link,
             dealership_name=dealership_name,
@@ -197,62 +241,74 @@ async def send_invite_email(
             inviter_name=current_user_profile.full_name
         )
         
-        if result["success"]:
-            logger.info(f"📧 Invite email sent successfully to {request.email} via Resend")
-        else:
-            logger.error(f"❌ Failed to send invite email: {result.get('error')}")
-        
-        return result
+        return {
+            "success": True,
+            "queued": True,
+            "message": f"Invite email queued for {request.email}",
+            "invite_link": invite_link
+        }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error sending invite email: {e}")
+        logger.error("Error sending invite email: %s", e)
         return {
             "success": False,
             "error": str(e)
         }
 
 
-@router.get("/invites", response_model=List[InviteListResponse])
+def _encode_invite_cursor(created_at: datetime, invite_id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{invite_id}".encode()).decode()
+
+
+def _decode_invite_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        created_at, invite_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(invite_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/invites", response_model=List[InviteListResponse], response_class=ORJSONResponse)
 async def get_dealership_invites(
+    response: Response,
+    status: Optional[Literal["pending", "accepted", "expired", "cancelled"]] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
     db: AsyncSession = Depends(get_db_session),
-    user_id: str = Depends(get_current_user_id),
-    dealership_id: str = Depends(get_user_dealership_id)
+    current_user_profile: CachedUserProfile = Depends(require_manager_or_owner)
 ):
     """
-    Get all invites for the current dealership
+    Get invites for the current dealership, newest first
     
-    Requires manager or owner role.
+    Requires manager or owner role. Optionally filtered by status. Without
+    limit or cursor every invite is returned; passing either pages the list
+    (100 per page by default), and when a full page is returned the
+    X-Next-Cursor header holds the cursor for the next page.
     """
-    # Check if user has permission to view invites
-    current_user_profile = await get_user_profile_by_user_id(session=db, user_id=user_id)
-    if not current_user_profile or current_user_profile.role not in ['owner', 'manager']:
-        raise HTTPException(
-            status_code=403, 
-            detail="You need manager or owner permissions to view invites"
-        )
+    if limit is None and cursor is not None:
+        limit = 100
+
+    invites = await get_invites_by_dealership(
+        session=db,
+        dealership_id=str(current_user_profile.dealership_id),
+        status=status,
+        before=_decode_invite_cursor(cursor) if cursor else None,
+        limit=limit
+    )
     
-    invites = await get_invites_by_dealership(session=db, dealership_id=dealership_id)
+    if limit is not None and len(invites) == limit:
+        last = invites[-1]
+        response.headers["X-Next-Cursor"] = _encode_invite_cursor(last.created_at, last.id)
     
-    return [
-        InviteListResponse(
-            id=str(invite.id),
-            email=invite.email,
-            role_name=invite.role,
-            invited_by=str(invite.invited_by),
-            created_at=invite.created_at,
-            expires_at=invite.expires_at,
-            status=invite.status,
-            token=invite.token_hash
-        ) for invite in invites
-    ]
+    return [InviteListResponse.model_validate(invite) for invite in invites]
 
 
 
 @router.post("/invites/complete", response_model=dict)
 async def complete_invite_for_existing_user(
-    payload: dict,
+    payload: InviteComplete,
     db: AsyncSession = Depends(get_db_session),
     current_user_id: str = Depends(get_current_user_id)
 ):
@@ -263,25 +319,10 @@ async def complete_invite_for_existing_user(
     and assigns the invited role. Does NOT create a new auth user.
     """
     try:
-        token = payload.get("token")
-        full_name = payload.get("full_name")
-        phone = payload.get("phone")
-
-        if not token:
-            raise HTTPException(status_code=400, detail="Missing invite token")
-
-        # Get the invite by token
-        invite = await get_invite_by_token(session=db, token=token)
+        # Claim the invite atomically; committed together with the profile below
+        invite = await claim_invite(session=db, token=payload.token)
         if not invite:
-            raise HTTPException(status_code=404, detail="Invalid or expired invite")
-
-        # Check status and expiry
-        from datetime import datetime, timezone
-        if invite.status != "pending":
-            raise HTTPException(status_code=400, detail="Invite has already been used or expired")
-        if invite.expires_at and invite.expires_at < datetime.now(timezone.utc):
-            await update_invite_status(session=db, invite_id=str(invite.id), status="expired")
-            raise HTTPException(status_code=400, detail="Invite has expired")
+            raise HTTPException(status_code=400, detail="Invalid, used, or expired invite")
 
         # Map role name for compatibility
         role_for_profile = invite.role
@@ -293,57 +334,37 @@ async def complete_invite_for_existing_user(
             session=db,
             user_id=current_user_id,
             dealership_id=str(invite.dealership_id),
-            full_name=full_name or "",
-            phone=phone,
+            full_name=payload.full_name or "",
+            phone=payload.phone,
             role=role_for_profile,
             timezone="America/New_York"
         )
+        user_profile_cache.pop(current_user_id, None)
 
         # Role is already assigned via user_profile creation above
         # No need for separate role system - using schema constraints
-        
-        # Mark invite as accepted
-        await update_invite_status(
-            session=db,
-            invite_id=str(invite.id),
-            status="accepted",
-            used_at=datetime.now(timezone.utc)
-        )
 
         return {"success": True, "message": "Invite completed"}
     except HTTPException:
+        await db.rollback()
         raise
     except Exception as e:
-        logger.error(f"Error completing invite: {e}")
+        logger.error("Error completing invite: %s", e)
+        # Release the claim so the invite can be retried
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to complete invite")
 
 @router.delete("/invites/{invite_id}")
 async def cancel_invite(
     invite_id: str,
     db: AsyncSession = Depends(get_db_session),
-    user_id: str = Depends(get_current_user_id),
-    dealership_id: str = Depends(get_user_dealership_id)
+    current_user_profile: CachedUserProfile = Depends(require_manager_or_owner)
 ):
     """
     Cancel an invite
     
     Requires manager or owner role.
     """
-    # Check if user has permission to cancel invites
-    logger.info(f"🔍 Checking delete permissions for user: {user_id}")
-    current_user_profile = await get_user_profile_by_user_id(session=db, user_id=user_id)
-    logger.info(f"🔍 User profile found: {current_user_profile is not None}")
-    if current_user_profile:
-        logger.info(f"🔍 User role: {current_user_profile.role}")
-        logger.info(f"🔍 Role in allowed list: {current_user_profile.role in ['owner', 'manager']}")
-    
-    if not current_user_profile or current_user_profile.role not in ['owner', 'manager']:
-        logger.error(f"❌ Permission denied for user {user_id} with role {current_user_profile.role if current_user_profile else 'None'}")
-        raise HTTPException(
-            status_code=403, 
-            detail="You need manager or owner permissions to cancel invites"
-        )
-    
     # Get the invite
     from maqro_backend.crud import get_invite_by_id
     invite = await get_invite_by_id(session=db, invite_id=invite_id)
@@ -352,8 +373,7 @@ async def cancel_invite(
         raise HTTPException(status_code=404, detail="Invite not found")
     
     # Verify the invite belongs to the authenticated user's dealership
-    # (invite.dealership_id is UUID object, dealership_id is string)
-    if str(invite.dealership_id) != dealership_id:
+    if invite.dealership_id != current_user_profile.dealership_id:
         raise HTTPException(status_code=403, detail="You can only cancel invites for your dealership")
     
     if invite.status != "pending":
@@ -11,6 +11,7 @@ from maqro_backend.crud import (
     get_leads_by_salesperson,
     get_leads_with_conversations_summary_by_salesperson
 )
+from maqro_backend.services.dealership_phone_mapping import dealership_phone_mapping_service
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -258,6 +259,7 @@ async def update_lead(
     if str(lead.dealership_id) != dealership_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    previous_phone = lead.phone
     update_data = lead_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         if field != 'dealership_id':  # Don't allow changing dealership
@@ -266,6 +268,12 @@ async def update_lead(
     await db.commit()
     await db.refresh(lead)
     
+    # Inbound SMS routing caches phone -> dealership; drop both numbers if the phone changed
+    if previous_phone != lead.phone:
+        for phone in (previous_phone, lead.phone):
+            if phone:
+                dealership_phone_mapping_service.invalidate_phone(phone)
+    
     return LeadResponse(
         id=str(lead.id),
         name=lead.name,
@@ -300,7 +308,12 @@ async def delete_lead(
     if str(lead.dealership_id) != dealership_id:
         raise HTTPException(status_code=403, detail="Access denied")
         
+    phone = lead.phone
     await db.delete(lead)
     await db.commit()
     
+    # Stop routing inbound SMS from this number by its cached dealership
+    if phone:
+        dealership_phone_mapping_service.invalidate_phone(phone)
+    
     return {"message": "Lead deleted successfully"}
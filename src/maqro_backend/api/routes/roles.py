@@ -9,13 +9,15 @@ from ..deps import (
     get_db_session, 
     get_current_user_id, 
     get_user_dealership_id,
-    require_dealership_owner,
     require_dealership_manager,
-    get_user_role_info,
-    get_roles_service
+    require_owner,
+    get_user_role_info
 )
+from ..responses import ORJSONResponse
 from ...services.roles_service import RolesService
+from ...services.profile_cache import CachedUserProfile
 from ...schemas.roles import (
+    RoleName,
     RoleResponse,
     UserRoleResponse,
     UserRoleCreate,
@@ -24,14 +26,18 @@ from ...schemas.roles import (
     DealershipUsersResponse,
     RolePermissionCheck
 )
+from ...utils.ttl_cache import TTLCache
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
+# The roles catalog only changes with a deploy/migration; keep it for a minute
+_roles_cache = TTLCache(maxsize=1, ttl=60)
 
-@router.get("/roles", response_model=List[RoleResponse])
+
+@router.get("/roles", response_model=List[RoleResponse], response_model_exclude_none=True)
 async def get_available_roles(
     user_id: str = Depends(get_current_user_id),  # Require authentication
     db: AsyncSession = Depends(get_db_session)
@@ -41,9 +47,13 @@ async def get_available_roles(
     
     Returns the roles that can be assigned to users.
     """
+    cached = _roles_cache.get("all")
+    if cached is not None:
+        return cached
+    
     try:
         roles = await RolesService.get_all_roles(db)
-        return [
+        response = [
             RoleResponse(
                 id=str(role.id),
                 name=role.name,
@@ -52,6 +62,8 @@ async def get_available_roles(
             )
             for role in roles
         ]
+        _roles_cache.set("all", response)
+        return response
     except Exception as e:
         logger.error(f"Error fetching roles: {str(e)}")
         raise HTTPException(status_code=500, detail="Error fetching available roles")
@@ -70,8 +82,10 @@ async def get_my_role_info(
     user_id, dealership_id, role_name = user_info
     
     try:
-        # Get additional role details
-        user_role = await RolesService.get_user_role(db, user_id, dealership_id)
+        # Role details and both permission flags come from a single lookup
+        user_role, can_manage_settings, can_assign_roles = await RolesService.get_user_role_with_permissions(
+            db, user_id, dealership_id
+        )
         
         if not user_role:
             raise HTTPException(status_code=404, detail="Role assignment not found")
@@ -87,8 +101,8 @@ async def get_my_role_info(
             ),
             "assigned_at": user_role.created_at,
             "permissions": {
-                "can_manage_settings": await RolesService.user_can_manage_settings(db, user_id, dealership_id),
-                "can_assign_roles": await RolesService.user_can_assign_roles(db, user_id, dealership_id)
+                "can_manage_settings": can_manage_settings,
+                "can_assign_roles": can_assign_roles
             }
         }
     except HTTPException:
@@ -98,7 +112,7 @@ async def get_my_role_info(
         raise HTTPException(status_code=500, detail="Error getting role information")
 
 
-@router.get("/roles/users", response_model=List[UserWithRoleResponse])
+@router.get("/roles/users", response_model=List[UserWithRoleResponse], response_model_exclude_none=True)
 async def get_dealership_users_with_roles(
     dealership_id: str = Depends(get_user_dealership_id),
     manager_user_id: str = Depends(require_dealership_manager),  # Permission check
@@ -118,11 +132,10 @@ async def get_dealership_users_with_roles(
         raise HTTPException(status_code=500, detail="Error getting dealership users")
 
 
-@router.post("/roles/assign", response_model=UserRoleResponse)
+@router.post("/roles/assign", response_model=UserRoleResponse, response_model_exclude_none=True)
 async def assign_user_role(
     role_assignment: UserRoleCreate,
-    dealership_id: str = Depends(get_user_dealership_id),
-    owner_user_id: str = Depends(require_dealership_owner),  # Permission check - owner only
+    owner_profile: CachedUserProfile = Depends(require_owner),  # Permission check - owner only
     db: AsyncSession = Depends(get_db_session)
 ):
     """
@@ -131,15 +144,10 @@ async def assign_user_role(
     Requires owner role.
     Creates or updates a user's role assignment.
     """
+    dealership_id = str(owner_profile.dealership_id)
+    owner_user_id = str(owner_profile.user_id)
+    
     try:
-        # Validate role name
-        valid_roles = ["owner", "manager", "salesperson"]
-        if role_assignment.role_name not in valid_roles:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}"
-            )
-        
         user_role = await RolesService.assign_user_role(
             db=db,
             user_id=role_assignment.user_id,
@@ -167,12 +175,11 @@ async def assign_user_role(
         raise HTTPException(status_code=500, detail="Error assigning user role")
 
 
-@router.put("/roles/users/{target_user_id}", response_model=UserRoleResponse)
+@router.put("/roles/users/{target_user_id}", response_model=UserRoleResponse, response_model_exclude_none=True)
 async def update_user_role(
     target_user_id: str,
     role_update: UserRoleUpdate,
-    dealership_id: str = Depends(get_user_dealership_id),
-    owner_user_id: str = Depends(require_dealership_owner),  # Permission check - owner only
+    owner_profile: CachedUserProfile = Depends(require_owner),  # Permission check - owner only
     db: AsyncSession = Depends(get_db_session)
 ):
     """
@@ -181,15 +188,10 @@ async def update_user_role(
     Requires owner role.
     Updates an existing user's role assignment.
     """
+    dealership_id = str(owner_profile.dealership_id)
+    owner_user_id = str(owner_profile.user_id)
+    
     try:
-        # Validate role name
-        valid_roles = ["owner", "manager", "salesperson"]
-        if role_update.role_name not in valid_roles:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}"
-            )
-        
         # Check if user exists in dealership
         existing_role = await RolesService.get_user_role(db, target_user_id, dealership_id)
         if not existing_role:
@@ -230,8 +232,7 @@ async def update_user_role(
 @router.delete("/roles/users/{target_user_id}")
 async def remove_user_role(
     target_user_id: str,
-    dealership_id: str = Depends(get_user_dealership_id),
-    owner_user_id: str = Depends(require_dealership_owner),  # Permission check - owner only
+    owner_profile: CachedUserProfile = Depends(require_owner),  # Permission check - owner only
     db: AsyncSession = Depends(get_db_session)
 ):
     """
@@ -240,6 +241,9 @@ async def remove_user_role(
     Requires owner role.
     This effectively removes the user from the dealership.
     """
+    dealership_id = str(owner_profile.dealership_id)
+    owner_user_id = str(owner_profile.user_id)
+    
     try:
         # Don't allow owners to remove themselves
         if target_user_id == owner_user_id:
@@ -266,7 +270,7 @@ async def remove_user_role(
 
 @router.get("/roles/check-permission")
 async def check_user_permission(
-    required_role: str,
+    required_role: RoleName,
     user_id: str = Depends(get_current_user_id),
     dealership_id: str = Depends(get_user_dealership_id),
     db: AsyncSession = Depends(get_db_session)
@@ -278,18 +282,9 @@ async def check_user_permission(
     Required role can be: 'salesperson', 'manager', or 'owner'
     """
     try:
-        valid_roles = ["salesperson", "manager", "owner"]
-        if required_role not in valid_roles:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid role. Must be one of: {', '.join(valid_roles)}"
-            )
-        
-        has_permission = await RolesService.user_has_role_level(
-            db, user_id, dealership_id, required_role
-        )
-        
+        # One lookup serves both fields; the level check is done locally
         current_role = await RolesService.get_user_role_name(db, user_id, dealership_id)
+        has_permission = RolesService.check_level_from_name(current_role, required_role)
         
         return {
             "user_id": user_id,
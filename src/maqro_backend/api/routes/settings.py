@@ -1,9 +1,10 @@
 """
 Settings API routes for hierarchical settings management
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Any
+import orjson
 
 from ..deps import (
     get_db_session, 
@@ -12,13 +13,16 @@ from ..deps import (
     require_dealership_manager,
     get_settings_service
 )
+from ..responses import ORJSONResponse, PydanticResponse
 from ...services.settings_service import SettingsService
+from ...utils.ttl_cache import TTLCache
 from ...schemas.settings import (
     SettingDefinitionResponse,
     DealershipSettingResponse,
     DealershipSettingUpdate,
     UserSettingResponse,
     UserSettingUpdate,
+    UserSettingsBatchRequest,
     EffectiveSettingResponse
 )
 import logging
@@ -27,8 +31,16 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Setting definitions only change with a migration; keep the encoded
+# catalog for five minutes
+_definitions_cache = TTLCache(maxsize=1, ttl=300)
 
-@router.get("/settings/definitions", response_model=List[SettingDefinitionResponse])
+
+@router.get(
+    "/settings/definitions",
+    response_class=ORJSONResponse,
+    responses={200: {"model": List[SettingDefinitionResponse]}}
+)
 async def get_setting_definitions(
     db: AsyncSession = Depends(get_db_session),
     user_id: str = Depends(get_current_user_id)  # Require authentication
@@ -38,25 +50,29 @@ async def get_setting_definitions(
     
     This endpoint shows what settings are available for configuration.
     """
+    body = _definitions_cache.get("all")
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+    
     try:
         definitions = await SettingsService.get_all_setting_definitions(db)
-        return [
-            SettingDefinitionResponse(
-                key=definition.key,
-                data_type=definition.data_type,
-                description=definition.description,
-                default_value=definition.default_value,
-                allowed_values=definition.allowed_values,
-                is_dealership_level=definition.is_dealership_level,
-                is_user_level=definition.is_user_level,
-                created_at=definition.created_at
-            )
+        body = orjson.dumps([
+            {
+                "key": definition.setting_key,
+                "scope": definition.scope,
+                "description": definition.description,
+                "default_value": definition.default_value,
+                "is_sensitive": definition.is_sensitive
+            }
             for definition in definitions
-        ]
+        ])
     except Exception as e:
         logger.error(f"Error fetching setting definitions: {str(e)}")
         raise HTTPException(status_code=500, detail="Error fetching setting definitions")
 
+    _definitions_cache.set("all", body)
+    return Response(content=body, media_type="application/json")
+
 
 @router.get("/settings/user/{setting_key}")
 async def get_user_setting(
@@ -78,7 +94,30 @@ async def get_user_setting(
         raise HTTPException(status_code=500, detail=f"Error getting setting {setting_key}")
 
 
-@router.get("/settings/user/{setting_key}/detailed", response_model=EffectiveSettingResponse)
+@router.post("/settings/user/batch", response_class=ORJSONResponse)
+async def get_user_settings_batch(
+    batch: UserSettingsBatchRequest,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db_session)
+):
+    """
+    Get effective values for several settings for the current user
+    
+    Resolves every key in one query instead of one request per key.
+    Returns a {key: value} map; unknown keys are omitted.
+    """
+    try:
+        return ORJSONResponse(await SettingsService.get_user_settings_bulk(db, user_id, batch.keys))
+    except Exception as e:
+        logger.error(f"Error getting settings batch for user {user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error getting settings")
+
+
+@router.get(
+    "/settings/user/{setting_key}/detailed",
+    response_class=PydanticResponse,
+    responses={200: {"model": EffectiveSettingResponse}}
+)
 async def get_user_setting_detailed(
     setting_key: str,
     user_id: str = Depends(get_current_user_id),
@@ -91,7 +130,7 @@ async def get_user_setting_detailed(
     (user override, dealership setting, or default value).
     """
     try:
-        return await SettingsService.get_user_setting_with_source(db, user_id, setting_key)
+        return PydanticResponse(await SettingsService.get_user_setting_with_source(db, user_id, setting_key))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -99,7 +138,7 @@ async def get_user_setting_detailed(
         raise HTTPException(status_code=500, detail=f"Error getting setting details")
 
 
-@router.put("/settings/user", response_model=UserSettingResponse)
+@router.put("/settings/user", response_class=PydanticResponse, responses={200: {"model": UserSettingResponse}})
 async def update_user_setting(
     setting_update: UserSettingUpdate,
     user_id: str = Depends(get_current_user_id),
@@ -120,14 +159,15 @@ async def update_user_setting(
             updated_by=user_id
         )
         
-        return UserSettingResponse(
+        # Fields come straight from the persisted row, so skip validation
+        return PydanticResponse(UserSettingResponse.model_construct(
             user_id=str(setting.user_id),
             setting_key=setting.setting_key,
             setting_value=setting.setting_value,
             created_at=setting.created_at,
             updated_at=setting.updated_at,
             updated_by=str(setting.updated_by) if setting.updated_by else None
-        )
+        ))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -135,7 +175,11 @@ async def update_user_setting(
         raise HTTPException(status_code=500, detail="Error updating user setting")
 
 
-@router.get("/settings/user", response_model=List[UserSettingResponse])
+@router.get(
+    "/settings/user",
+    response_class=ORJSONResponse,
+    responses={200: {"model": List[UserSettingResponse]}}
+)
 async def get_my_user_settings(
     user_id: str = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db_session)
@@ -147,17 +191,18 @@ async def get_my_user_settings(
     """
     try:
         settings = await SettingsService.get_user_settings(db, user_id)
-        return [
-            UserSettingResponse(
-                user_id=str(setting.user_id),
-                setting_key=setting.setting_key,
-                setting_value=setting.setting_value,
-                created_at=setting.created_at,
-                updated_at=setting.updated_at,
-                updated_by=str(setting.updated_by) if setting.updated_by else None
-            )
+        # Rows carry text ids and datetimes, which orjson encodes natively
+        return ORJSONResponse([
+            {
+                "user_id": setting.user_id,
+                "setting_key": setting.setting_key,
+                "setting_value": setting.setting_value,
+                "created_at": setting.created_at,
+                "updated_at": setting.updated_at,
+                "updated_by": setting.updated_by
+            }
             for setting in settings
-        ]
+        ])
     except Exception as e:
         logger.error(f"Error getting user settings for {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting user settings")
@@ -190,7 +235,11 @@ async def delete_user_setting(
 
 # Dealership settings endpoints (require manager+ permissions)
 
-@router.get("/settings/dealership", response_model=List[DealershipSettingResponse])
+@router.get(
+    "/settings/dealership",
+    response_class=ORJSONResponse,
+    responses={200: {"model": List[DealershipSettingResponse]}}
+)
 async def get_dealership_settings(
     dealership_id: str = Depends(get_user_dealership_id),
     manager_user_id: str = Depends(require_dealership_manager),  # Permission check
@@ -204,23 +253,23 @@ async def get_dealership_settings(
     """
     try:
         settings = await SettingsService.get_dealership_settings(db, dealership_id)
-        return [
-            DealershipSettingResponse(
-                dealership_id=str(setting.dealership_id),
-                setting_key=setting.setting_key,
-                setting_value=setting.setting_value,
-                created_at=setting.created_at,
-                updated_at=setting.updated_at,
-                updated_by=str(setting.updated_by) if setting.updated_by else None
-            )
+        return ORJSONResponse([
+            {
+                "dealership_id": setting.dealership_id,
+                "setting_key": setting.setting_key,
+                "setting_value": setting.setting_value,
+                "created_at": setting.created_at,
+                "updated_at": setting.updated_at,
+                "updated_by": setting.updated_by
+            }
             for setting in settings
-        ]
+        ])
     except Exception as e:
         logger.error(f"Error getting dealership settings for {dealership_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting dealership settings")
 
 
-@router.put("/settings/dealership", response_model=DealershipSettingResponse)
+@router.put("/settings/dealership", response_class=PydanticResponse, responses={200: {"model": DealershipSettingResponse}})
 async def update_dealership_setting(
     setting_update: DealershipSettingUpdate,
     dealership_id: str = Depends(get_user_dealership_id),
@@ -242,14 +291,15 @@ async def update_dealership_setting(
             updated_by=manager_user_id
         )
         
-        return DealershipSettingResponse(
+        # Fields come straight from the persisted row, so skip validation
+        return PydanticResponse(DealershipSettingResponse.model_construct(
             dealership_id=str(setting.dealership_id),
             setting_key=setting.setting_key,
             setting_value=setting.setting_value,
             created_at=setting.created_at,
             updated_at=setting.updated_at,
             updated_by=str(setting.updated_by) if setting.updated_by else None
-        )
+        ))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -257,7 +307,11 @@ async def update_dealership_setting(
         raise HTTPException(status_code=500, detail="Error updating dealership setting")
 
 
-@router.get("/settings/effective/{setting_key}")
+@router.get(
+    "/settings/effective/{setting_key}",
+    response_class=PydanticResponse,
+    responses={200: {"model": EffectiveSettingResponse}}
+)
 async def get_effective_setting_for_dealership(
     setting_key: str,
     user_id: str = Depends(get_current_user_id),
@@ -270,8 +324,7 @@ async def get_effective_setting_for_dealership(
     (user, dealership, or default) provides the value.
     """
     try:
-        result = await SettingsService.get_user_setting_with_source(db, user_id, setting_key)
-        return result
+        return PydanticResponse(await SettingsService.get_user_setting_with_source(db, user_id, setting_key))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -1,47 +1,36 @@
-from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, Request, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+import orjson
 import stripe
 import os
-import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any
 
-from ...db.session import get_db
-from sqlalchemy import text
-from ...db.models import Dealership, SubscriptionPlan, DealershipSubscription, SubscriptionEvent
+from ..deps import get_db_session
+from ...services.stripe_event_service import EVENT_HANDLERS, process_stored_event, store_event
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["stripe"])  # API router tags only, path defined at include level
 
-# Initialize Stripe
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+# stripe.api_key is set by stripe_event_service, which makes the API calls
 webhook_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
 
 
-def _ts_to_dt(value: Any) -> datetime | None:
-    """Convert a unix timestamp (seconds) to datetime, or return None when missing."""
-    try:
-        if value is None:
-            return None
-        return datetime.fromtimestamp(int(value))
-    except Exception:
-        return None
-
-
 @router.post("/stripe/webhook")
-async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
+async def stripe_webhook(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db_session)
+):
     """
     Handle Stripe webhook events for subscription tracking
+    
+    Verifies the signature and stores the event, then acknowledges and
+    applies it after the response. Stored events that fail to apply are
+    retried by stripe_event_service, so nothing acknowledged is lost.
     """
     try:
-        # Test database connection
-        try:
-            await db.execute(text("SELECT 1"))
-        except Exception as db_error:
-            logger.error(f"Database connection failed: {db_error}")
-            raise HTTPException(status_code=500, detail="Database connection failed")
+        # Stale connections are caught by the engine's pool_pre_ping, no probe needed
         # Get the raw body and signature
         body = await request.body()
         signature = request.headers.get("stripe-signature")
@@ -57,11 +46,15 @@ async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
             logger.error("STRIPE_SECRET_KEY environment variable not set")
             raise HTTPException(status_code=500, detail="Stripe secret key not configured")
         
-        # Verify webhook signature
+        # Verify the signature, then parse the raw bytes once with orjson instead
+        # of letting construct_event re-parse with stdlib json. stripe>=7 computes
+        # the signature over the payload as a str, so verify the decoded body
+        # (a UnicodeDecodeError is a ValueError and lands in the 400 below)
         try:
-            event = stripe.Webhook.construct_event(
-                body, signature, webhook_secret
+            stripe.WebhookSignature.verify_header(
+                body.decode("utf-8"), signature, webhook_secret, tolerance=stripe.Webhook.DEFAULT_TOLERANCE
             )
+            event = orjson.loads(body)
         except ValueError as e:
             logger.error(f"Invalid payload: {e}")
             raise HTTPException(status_code=400, detail="Invalid payload")
@@ -73,265 +66,23 @@ async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
         logger.info(f"Event ID: {event.get('id')}")
         logger.info(f"Event data: {event.get('data', {}).get('object', {})}")
         
-        # Handle the event
-        if event['type'] == 'checkout.session.completed':
-            logger.info("Processing checkout.session.completed event")
-            await handle_checkout_session_completed(event['data']['object'], db)
-        elif event['type'] == 'customer.subscription.created':
-            logger.info("Processing customer.subscription.created event")
-            await handle_subscription_created(event['data']['object'], db)
-        elif event['type'] == 'customer.subscription.updated':
-            logger.info("Processing customer.subscription.updated event")
-            await handle_subscription_updated(event['data']['object'], db)
-        elif event['type'] == 'customer.subscription.deleted':
-            logger.info("Processing customer.subscription.deleted event")
-            await handle_subscription_deleted(event['data']['object'], db)
-        elif event['type'] == 'invoice.payment_succeeded':
-            logger.info("Processing invoice.payment_succeeded event")
-            await handle_payment_succeeded(event['data']['object'], db)
-        elif event['type'] == 'invoice.payment_failed':
-            logger.info("Processing invoice.payment_failed event")
-            await handle_payment_failed(event['data']['object'], db)
-        else:
+        if event['type'] not in EVENT_HANDLERS:
             logger.info(f"Unhandled event type: {event['type']}")
+            return {"received": True}
+        
+        # Commit the raw event before acking; if this fails Stripe gets a 5xx
+        # and redelivers. Redeliveries of applied events are acked as duplicates
+        if not await store_event(db, event):
+            logger.info(f"Duplicate Stripe event {event['id']}, already processed")
+            return {"received": True, "duplicate": True}
+        
+        logger.info(f"Queueing {event['type']} event")
+        background_tasks.add_task(process_stored_event, event['id'])
         
         return {"received": True}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Webhook error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-
-
-async def handle_checkout_session_completed(session: Dict[str, Any], db: AsyncSession):
-    """Handle successful checkout session"""
-    logger.info(f"Processing checkout session completed: {session['id']}")
-    logger.info(f"Session metadata: {session.get('metadata', {})}")
-    
-    metadata = session.get('metadata', {})
-    dealership_id = metadata.get('dealership_id')
-    product_id = metadata.get('product_id')
-    
-    logger.info(f"Dealership ID: {dealership_id}, Product ID: {product_id}")
-    
-    if not dealership_id or not product_id:
-        logger.error("Missing dealership_id or product_id in session metadata")
-        logger.error(f"Available metadata keys: {list(metadata.keys())}")
-        return
-    
-    # Get the subscription plan
-    try:
-        plan = await db.execute(
-            text("SELECT * FROM subscription_plans WHERE stripe_product_id = :product_id"),
-            {"product_id": product_id}
-        )
-        plan = plan.fetchone()
-        
-        if not plan:
-            logger.error(f"Subscription plan not found for product: {product_id}")
-            return
-        
-        logger.info(f"Found subscription plan: {plan}")
-    except Exception as e:
-        logger.error(f"Error querying subscription plan: {e}")
-        return
-    
-    # Create subscription record
-    subscription_data = {
-        "dealership_id": dealership_id,
-        "subscription_plan_id": plan.id,
-        "stripe_subscription_id": session.get('subscription'),
-        "stripe_customer_id": session.get('customer'),
-        "status": "active",
-        "current_period_start": datetime.now(),
-        "current_period_end": datetime.now().replace(day=28) + timedelta(days=32),  # Next month
-    }
-    
-    result = await db.execute(
-        text(
-            """
-            INSERT INTO dealership_subscriptions 
-            (dealership_id, subscription_plan_id, stripe_subscription_id, stripe_customer_id, status, current_period_start, current_period_end)
-            VALUES (:dealership_id, :subscription_plan_id, :stripe_subscription_id, :stripe_customer_id, :status, :current_period_start, :current_period_end)
-            RETURNING id
-            """
-        ),
-        subscription_data
-    )
-    subscription_id = result.fetchone()[0]
-    
-    # Update dealership with current subscription
-    await db.execute(
-        text("UPDATE dealerships SET current_subscription_id = :subscription_id WHERE id = :dealership_id"),
-        {"subscription_id": subscription_id, "dealership_id": dealership_id}
-    )
-    
-    # Log the event
-    await db.execute(
-        text(
-            """
-            INSERT INTO subscription_events 
-            (dealership_subscription_id, event_type, stripe_event_id, event_data)
-            VALUES (:subscription_id, :event_type, :stripe_event_id, :event_data)
-            """
-        ),
-        {
-            "subscription_id": subscription_id,
-            "event_type": "created",
-            "stripe_event_id": session['id'],
-            "event_data": json.dumps({
-                "tier": metadata.get('tier'),
-                "quantity": metadata.get('quantity'),
-                "price_per_unit": metadata.get('price_per_unit'),
-                "setup_fee": metadata.get('setup_fee'),
-            })
-        }
-    )
-    
-    await db.commit()
-    logger.info(f"Subscription created successfully: {subscription_id}")
-
-
-async def handle_subscription_created(subscription: Dict[str, Any], db: AsyncSession):
-    """Handle subscription created event"""
-    logger.info(f"Processing subscription created: {subscription['id']}")
-    
-    await db.execute(
-        text(
-            """
-            UPDATE dealership_subscriptions 
-            SET stripe_subscription_id = :stripe_id, stripe_customer_id = :customer_id, 
-                status = :status, current_period_start = :period_start, current_period_end = :period_end
-            WHERE stripe_subscription_id = :stripe_id
-            """
-        ),
-        {
-            "stripe_id": subscription.get('id'),
-            "customer_id": subscription.get('customer'),
-            "status": subscription.get('status'),
-            "period_start": _ts_to_dt(subscription.get('current_period_start')),
-            "period_end": _ts_to_dt(subscription.get('current_period_end')),
-        }
-    )
-    await db.commit()
-
-
-async def handle_subscription_updated(subscription: Dict[str, Any], db: AsyncSession):
-    """Handle subscription updated event"""
-    logger.info(f"Processing subscription updated: {subscription['id']}")
-    
-    await db.execute(
-        text(
-            """
-            UPDATE dealership_subscriptions 
-            SET status = :status, current_period_start = :period_start, current_period_end = :period_end,
-                canceled_at = :canceled_at
-            WHERE stripe_subscription_id = :stripe_id
-            """
-        ),
-        {
-            "stripe_id": subscription.get('id'),
-            "status": subscription.get('status'),
-            "period_start": _ts_to_dt(subscription.get('current_period_start')),
-            "period_end": _ts_to_dt(subscription.get('current_period_end')),
-            "canceled_at": _ts_to_dt(subscription.get('canceled_at')),
-        }
-    )
-    await db.commit()
-
-
-async def handle_subscription_deleted(subscription: Dict[str, Any], db: AsyncSession):
-    """Handle subscription deleted event"""
-    logger.info(f"Processing subscription deleted: {subscription['id']}")
-    
-    await db.execute(
-        text(
-            """
-            UPDATE dealership_subscriptions 
-            SET status = 'canceled', canceled_at = :canceled_at
-            WHERE stripe_subscription_id = :stripe_id
-            """
-        ),
-        {
-            "stripe_id": subscription['id'],
-            "canceled_at": datetime.now(),
-        }
-    )
-    await db.commit()
-
-
-async def handle_payment_succeeded(invoice: Dict[str, Any], db: AsyncSession):
-    """Handle successful payment"""
-    logger.info(f"Processing payment succeeded: {invoice['id']}")
-    
-    if not invoice.get('subscription'):
-        return
-    
-    # Log the event
-    result = await db.execute(
-        text("SELECT id FROM dealership_subscriptions WHERE stripe_subscription_id = :stripe_id"),
-        {"stripe_id": invoice['subscription']}
-    )
-    subscription = result.fetchone()
-    
-    if subscription:
-        await db.execute(
-            text(
-                """
-                INSERT INTO subscription_events 
-                (dealership_subscription_id, event_type, stripe_event_id, event_data)
-                VALUES (:subscription_id, :event_type, :stripe_event_id, :event_data)
-                """
-            ),
-            {
-                "subscription_id": subscription[0],
-                "event_type": "payment_succeeded",
-                "stripe_event_id": invoice['id'],
-                "event_data": json.dumps({
-                    "amount_paid": invoice['amount_paid'],
-                    "currency": invoice['currency'],
-                })
-            }
-        )
-        await db.commit()
-
-
-async def handle_payment_failed(invoice: Dict[str, Any], db: AsyncSession):
-    """Handle failed payment"""
-    logger.info(f"Processing payment failed: {invoice['id']}")
-    
-    if not invoice.get('subscription'):
-        return
-    
-    # Update subscription status
-    await db.execute(
-        text("UPDATE dealership_subscriptions SET status = 'past_due' WHERE stripe_subscription_id = :stripe_id"),
-        {"stripe_id": invoice['subscription']}
-    )
-    
-    # Log the event
-    result = await db.execute(
-        text("SELECT id FROM dealership_subscriptions WHERE stripe_subscription_id = :stripe_id"),
-        {"stripe_id": invoice['subscription']}
-    )
-    subscription = result.fetchone()
-    
-    if subscription:
-        await db.execute(
-            text(
-                """
-                INSERT INTO subscription_events 
-                (dealership_subscription_id, event_type, stripe_event_id, event_data)
-                VALUES (:subscription_id, :event_type, :stripe_event_id, :event_data)
-                """
-            ),
-            {
-                "subscription_id": subscription[0],
-                "event_type": "payment_failed",
-                "stripe_event_id": invoice['id'],
-                "event_data": json.dumps({
-                    "amount_due": invoice['amount_due'],
-                    "currency": invoice['currency'],
-                })
-            }
-        )
-        await db.commit()
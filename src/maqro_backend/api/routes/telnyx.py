@@ -1,34 +1,40 @@
 """
 Telnyx Messaging API routes for sending and receiving SMS messages
 """
-from fastapi import APIRouter, Depends, HTTPException, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any
+import asyncio
 import logging
+import orjson
 from datetime import datetime
-import pytz
 
-from maqro_rag import EnhancedRAGService
-from maqro_rag.entity_parser import EntityParser, VehicleQuery
-from maqro_rag.db_retriever import DatabaseRAGRetriever
+from ...core.rate_limit import limiter
+from ...api.responses import ORJSONResponse
 from ...api.deps import get_db_session, get_current_user_id, get_user_dealership_id, get_enhanced_rag_services
 from ...core.lifespan import get_db_retriever
+from ...db.session import AsyncSessionLocal
 from ...services.telnyx_service import telnyx_service
 from ...services.message_flow_service import message_flow_service
 from ...services.dealership_phone_mapping import dealership_phone_mapping_service
 
+if TYPE_CHECKING:
+    # Annotations only; the instances are injected by the Depends providers
+    from maqro_rag import EnhancedRAGService
+    from maqro_rag.db_retriever import DatabaseRAGRetriever
+
 
 logger = logging.getLogger(__name__)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Longest the webhook waits on message processing before acking Telnyx;
+# anything slower finishes after the response (Telnyx retries slow webhooks)
+_PROCESSING_TIMEOUT_SECONDS = 8.0
 
-# Initialize entity parser for better query understanding
-entity_parser = EntityParser()
+# Telnyx message webhooks are a few KB; anything far larger is not one of them
+MAX_WEBHOOK_BYTES = 64 * 1024
 
 
 @router.post("/send-sms")
@@ -47,7 +53,7 @@ async def send_telnyx_sms(
         if not to or not message:
             raise HTTPException(status_code=400, detail="Missing 'to' or 'body' parameters")
         
-        logger.info(f"Sending Telnyx SMS to {to}: {message}")
+        logger.info("Sending Telnyx SMS to %s: %s", to, message)
         
 
         # Send SMS via Telnyx service
@@ -66,20 +72,54 @@ async def send_telnyx_sms(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error sending Telnyx SMS: {e}")
+        logger.error("Error sending Telnyx SMS: %s", e)
         raise HTTPException(status_code=500, detail="Failed to send SMS")
 
 
  
 
 
+async def _send_and_log(to: str, message: str, message_type: str):
+    """Send a webhook's SMS reply and log the outcome."""
+    response_result = await telnyx_service.send_sms(to, message)
+    if response_result["success"]:
+        logger.info("Sent response to salesperson %s via %s", to, message_type)
+    else:
+        logger.error("Failed to send response to salesperson: %s", response_result['error'])
+
+
+def _needs_salesperson_reply(result: Dict[str, Any]) -> bool:
+    """Whether a processed message needs an SMS reply sent back to the salesperson."""
+    return bool(result.get("success") and result.get("message")) and (
+        result.get("needs_clarification") or result.get("has_pending_approval") is False
+    )
+
+
+async def _process_message(**kwargs) -> Dict[str, Any]:
+    """Run message processing on its own session so it can outlive the request."""
+    async with AsyncSessionLocal() as session:
+        return await message_flow_service.process_incoming_message(session=session, **kwargs)
+
+
+async def _finish_deferred(task: "asyncio.Task[Dict[str, Any]]", phone: str, message_type: str):
+    """Wait for processing that overran the webhook timeout, then send any reply."""
+    try:
+        result = await task
+    except Exception:
+        logger.exception("Deferred Telnyx message processing failed for %s", phone)
+        return
+    if _needs_salesperson_reply(result):
+        await _send_and_log(phone, result["message"], message_type)
+
+
 @router.post("/webhook")
 @limiter.limit("200/minute")  # High limit for legitimate webhook traffic
 async def telnyx_webhook(
     request: Request,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db_session),
-    enhanced_rag_service: EnhancedRAGService = Depends(get_enhanced_rag_services),
-    db_retriever: DatabaseRAGRetriever = Depends(get_db_retriever)
+    enhanced_rag_service: "EnhancedRAGService" = Depends(get_enhanced_rag_services),
+    db_retriever: "DatabaseRAGRetriever" = Depends(get_db_retriever)
 ):
     """
     Telnyx webhook endpoint for receiving inbound SMS messages
@@ -93,20 +133,32 @@ async def telnyx_webhook(
     6. Generates AI response using RAG system
     7. Sends AI response back to customer via Telnyx
     """
+    # Reject oversized payloads before buffering or verifying them
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_WEBHOOK_BYTES:
+        raise HTTPException(status_code=413, detail="Webhook payload too large")
+
     try:
         # Get raw body for signature verification
         body = await request.body()
+        if len(body) > MAX_WEBHOOK_BYTES:
+            raise HTTPException(status_code=413, detail="Webhook payload too large")
         signature = request.headers.get("X-Telnyx-Signature", "")
 
         # Verify webhook signature (currently disabled - see telnyx_service.py)
         # TODO: Implement ED25519 verification for production
-        if not telnyx_service.verify_webhook_signature(body.decode(), signature):
+        if not telnyx_service.verify_webhook_signature(body, signature):
             logger.warning("Invalid Telnyx webhook signature - verification disabled")
             # Note: Not raising HTTPException to allow webhooks through during development
 
-        # Parse JSON payload
-        webhook_data = await request.json()
-        logger.info(f"Received Telnyx webhook: {webhook_data}")
+        # Cheap byte check so payloads without an event type skip the JSON parse
+        if b'"event_type"' not in body:
+            logger.info("No valid message found in webhook")
+            return {"status": "ok", "message": "No message to process"}
+
+        # Parse JSON payload from the bytes already read above
+        webhook_data = orjson.loads(body)
+        logger.debug("Received Telnyx webhook: %r", webhook_data)
         
         # Parse message from webhook
         parsed_message = telnyx_service.parse_webhook_message(webhook_data)
@@ -117,7 +169,7 @@ async def telnyx_webhook(
         
         # Only process SMS/MMS text messages for now
         if parsed_message.get("message_type") not in ["SMS", "MMS"]:
-            logger.info(f"Ignoring non-text message type: {parsed_message.get('message_type')}")
+            logger.info("Ignoring non-text message type: %s", parsed_message.get('message_type'))
             return {"status": "ok", "message": "Non-text message ignored"}
         
         from_phone = parsed_message.get("from_phone")
@@ -134,7 +186,7 @@ async def telnyx_webhook(
         
         # Normalize phone number
         normalized_phone = telnyx_service.normalize_phone_number(from_phone)
-        logger.info(f"Processing {message_type} message from {normalized_phone}: {message_text}")
+        logger.info("Processing %s message from %s: %s", message_type, normalized_phone, message_text)
         
         # Determine which dealership this phone number belongs to
         dealership_id = await dealership_phone_mapping_service.get_dealership_for_phone(
@@ -143,44 +195,39 @@ async def telnyx_webhook(
         )
         
         if not dealership_id:
-            logger.error(f"Could not determine dealership for phone {normalized_phone}")
+            logger.error("Could not determine dealership for phone %s", normalized_phone)
             return {"status": "error", "message": "Unable to determine dealership for this phone number"}
         
-        logger.info(f"Determined dealership {dealership_id} for phone {normalized_phone}")
+        logger.info("Determined dealership %s for phone %s", dealership_id, normalized_phone)
         
-        # Use the new message flow service to handle the incoming message
-        result = await message_flow_service.process_incoming_message(
-            session=db,
+        # Use the new message flow service to handle the incoming message.
+        # Shielded so a timeout only stops the wait, not the processing itself
+        task = asyncio.create_task(_process_message(
             from_phone=normalized_phone,
             message_text=message_text,
             dealership_id=dealership_id,
             enhanced_rag_service=enhanced_rag_service,
             message_source=message_type.lower()
-        )
+        ))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), timeout=_PROCESSING_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Message processing for %s exceeded %ss; deferring", normalized_phone, _PROCESSING_TIMEOUT_SECONDS)
+            background_tasks.add_task(_finish_deferred, task, normalized_phone, message_type)
+            return {"status": "deferred", "message": "Message accepted; processing will complete shortly"}
         
         # If this was a salesperson message that needs a response, send it
-        if result.get("success") and result.get("message"):
-            # Check if we need to send a response back to the salesperson
-            if result.get("needs_clarification") or result.get("has_pending_approval") is False:
-                # Send response via SMS
-                response_result = await telnyx_service.send_sms(normalized_phone, result["message"])
-                
-                if response_result["success"]:
-                    logger.info(f"Sent response to salesperson {normalized_phone} via {message_type}")
-                    result["response_sent_to_salesperson"] = True
-                else:
-                    logger.error(f"Failed to send response to salesperson: {response_result['error']}")
-                    result["response_sent_to_salesperson"] = False
-                    result["salesperson_response_error"] = response_result["error"]
+        if _needs_salesperson_reply(result):
+            # Send the SMS after acking so Telnyx isn't kept waiting on the outbound call
+            background_tasks.add_task(_send_and_log, normalized_phone, result["message"], message_type)
+            result["response_queued_to_salesperson"] = True
         
         return result
             
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Telnyx webhook processing error: {e}")
-        logger.error(f"Error type: {type(e).__name__}")
-        logger.error(f"Error details: {str(e)}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Telnyx webhook processing error")
         return {"status": "error", "message": f"Internal processing error: {str(e)}"}
 
 
@@ -203,7 +250,7 @@ async def get_message_status(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting message status: {e}")
+        logger.error("Error getting message status: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get message status")
 
 
@@ -237,7 +284,7 @@ async def health_check():
         }
         
     except Exception as e:
-        logger.error(f"Health check error: {e}")
+        logger.error("Health check error: %s", e)
         return {
             "status": "unhealthy",
             "message": f"Health check failed: {str(e)}",
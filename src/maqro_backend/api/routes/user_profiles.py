@@ -1,11 +1,13 @@
 """
 User Profile API routes
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+from pydantic import TypeAdapter
 
-from maqro_backend.api.deps import get_db_session, get_current_user_id, get_user_dealership_id, require_dealership_manager, require_dealership_owner
+from maqro_backend.api.deps import get_db_session, get_current_user_id, get_current_user_profile, get_user_dealership_id, require_dealership_manager, require_manager_or_owner, require_owner
+from maqro_backend.services.profile_cache import CachedUserProfile, user_profile_cache
 from maqro_backend.schemas.user_profile import (
     UserProfileCreate, 
     UserProfileResponse, 
@@ -17,9 +19,9 @@ from maqro_backend.services.roles_service import RolesService
 from maqro_backend.schemas.roles import RoleResponse
 from maqro_backend.crud import (
     create_user_profile,
-    get_user_profile_by_user_id,
     get_user_profiles_by_dealership,
-    update_user_profile
+    update_user_profile,
+    user_profile_exists
 )
 from maqro_backend.db.models import UserProfile
 from sqlalchemy import delete
@@ -31,6 +33,24 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Serializes a list of profile responses in one pydantic-core call
+_PROFILE_LIST_ADAPTER = TypeAdapter(List[UserProfileResponse])
+
+
+def _to_profile_response(profile: UserProfile | CachedUserProfile) -> UserProfileResponse:
+    """Build the response from a trusted DB row without running validators"""
+    return UserProfileResponse.model_construct(
+        id=str(profile.id),
+        user_id=str(profile.user_id),
+        dealership_id=str(profile.dealership_id) if profile.dealership_id else None,
+        full_name=profile.full_name,
+        phone=profile.phone,
+        role=profile.role,
+        timezone=profile.timezone,
+        created_at=profile.created_at,
+        updated_at=profile.updated_at
+    )
+
 
 @router.post("/user-profiles", response_model=UserProfileResponse)
 async def create_new_user_profile(
@@ -46,8 +66,7 @@ async def create_new_user_profile(
     logger.info(f"Creating user profile for user: {user_id}")
     
     # Check if profile already exists
-    existing_profile = await get_user_profile_by_user_id(session=db, user_id=user_id)
-    if existing_profile:
+    if await user_profile_exists(session=db, user_id=user_id):
         raise HTTPException(status_code=400, detail="User profile already exists")
     
     profile = await create_user_profile(
@@ -62,42 +81,34 @@ async def create_new_user_profile(
     
     logger.info(f"User profile created with ID: {profile.id}")
     
-    return UserProfileResponse(
-        id=str(profile.id),
-        user_id=str(profile.user_id),
-        dealership_id=str(profile.dealership_id) if profile.dealership_id else None,
-        full_name=profile.full_name,
-        phone=profile.phone,
-        role=profile.role,
-        timezone=profile.timezone,
-        created_at=profile.created_at,
-        updated_at=profile.updated_at
-    )
+    return _to_profile_response(profile)
+
+
+def _profile_etag(profile: CachedUserProfile) -> str:
+    """Weak ETag that changes whenever the profile row is updated"""
+    updated_at = profile.updated_at or profile.created_at
+    return f'W/"{profile.id}-{updated_at.timestamp() if updated_at else 0}"'
 
 
 @router.get("/user-profiles/me", response_model=UserProfileResponse)
 async def get_my_profile(
-    db: AsyncSession = Depends(get_db_session),
-    user_id: str = Depends(get_current_user_id)
+    request: Request,
+    response: Response,
+    profile: CachedUserProfile = Depends(get_current_user_profile)
 ):
     """
     Get the current user's profile
+    
+    Sends an ETag; a matching If-None-Match gets an empty 304 so clients
+    polling on resume skip the body.
     """
-    profile = await get_user_profile_by_user_id(session=db, user_id=user_id)
-    if not profile:
-        raise HTTPException(status_code=404, detail="User profile not found")
+    etag = _profile_etag(profile)
+    if etag in request.headers.get("if-none-match", "").replace(" ", "").split(","):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
     
-    return UserProfileResponse(
-        id=str(profile.id),
-        user_id=str(profile.user_id),
-        dealership_id=str(profile.dealership_id) if profile.dealership_id else None,
-        full_name=profile.full_name,
-        phone=profile.phone,
-        role=profile.role,
-        timezone=profile.timezone,
-        created_at=profile.created_at,
-        updated_at=profile.updated_at
-    )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return _to_profile_response(profile)
 
 
 @router.put("/user-profiles/me", response_model=UserProfileResponse)
@@ -119,36 +130,26 @@ async def update_my_profile(
     
     if not profile:
         raise HTTPException(status_code=404, detail="User profile not found")
+
+    user_profile_cache.pop(user_id, None)
     
-    return UserProfileResponse(
-        id=str(profile.id),
-        user_id=str(profile.user_id),
-        dealership_id=str(profile.dealership_id) if profile.dealership_id else None,
-        full_name=profile.full_name,
-        phone=profile.phone,
-        role=profile.role,
-        timezone=profile.timezone,
-        created_at=profile.created_at,
-        updated_at=profile.updated_at
-    )
+    return _to_profile_response(profile)
 
 
 @router.get("/user-profiles/me/with-role", response_model=UserProfileWithRoleResponse)
 async def get_my_profile_with_role(
     db: AsyncSession = Depends(get_db_session),
     user_id: str = Depends(get_current_user_id),
-    dealership_id: str = Depends(get_user_dealership_id)
+    dealership_id: str = Depends(get_user_dealership_id),
+    profile: CachedUserProfile = Depends(get_current_user_profile)
 ):
     """
     Get the current user's profile with role information
     
     Returns enhanced profile data including the user's role in the current dealership.
+    The profile comes from the same per-request lookup that resolved the
+    dealership, so only the role costs a query.
     """
-    # Get basic profile
-    profile = await get_user_profile_by_user_id(session=db, user_id=user_id)
-    if not profile:
-        raise HTTPException(status_code=404, detail="User profile not found")
-    
     # Get role information
     try:
         user_role = await RolesService.get_user_role(db, user_id, dealership_id)
@@ -187,8 +188,7 @@ async def get_my_profile_with_role(
 @router.get("/user-profiles/dealership", response_model=List[UserProfileResponse])
 async def get_dealership_user_profiles(
     db: AsyncSession = Depends(get_db_session),
-    dealership_id: str = Depends(get_user_dealership_id),
-    user_id: str = Depends(get_current_user_id)  # Simplified permission check
+    current_user_profile: CachedUserProfile = Depends(require_manager_or_owner)
 ):
     """
     Get all user profiles for the current dealership
@@ -196,34 +196,23 @@ async def get_dealership_user_profiles(
     Requires manager or owner role.
     Returns all user profiles in the dealership.
     """
-    # Optimization: Fetch all profiles in one query, then check permission from result
-    profiles = await get_user_profiles_by_dealership(session=db, dealership_id=dealership_id)
-
-    # Check if current user has manager/owner role (from the fetched profiles)
-    current_user_profile = next((p for p in profiles if str(p.user_id) == user_id), None)
-    if not current_user_profile or current_user_profile.role not in ['owner', 'manager']:
-        raise HTTPException(status_code=403, detail="Insufficient permissions. Owner or manager role required.")
+    # The caller's role comes from the per-request (cached) profile, so
+    # unauthorized callers never pay for the dealership-wide query
+    profiles = await get_user_profiles_by_dealership(
+        session=db, dealership_id=str(current_user_profile.dealership_id)
+    )
     
-    return [
-        UserProfileResponse(
-            id=str(profile.id),
-            user_id=str(profile.user_id),
-            dealership_id=str(profile.dealership_id) if profile.dealership_id else None,
-            full_name=profile.full_name,
-            phone=profile.phone,
-            role=profile.role,
-            timezone=profile.timezone,
-            created_at=profile.created_at,
-            updated_at=profile.updated_at
-        ) for profile in profiles
-    ]
+    # Returned as a ready Response so the list isn't revalidated against response_model
+    return Response(
+        _PROFILE_LIST_ADAPTER.dump_json([_to_profile_response(profile) for profile in profiles]),
+        media_type="application/json"
+    )
 
 
 @router.delete("/user-profiles/{target_user_id}")
 async def remove_user_from_dealership(
     target_user_id: str,
-    dealership_id: str = Depends(get_user_dealership_id),
-    owner_user_id: str = Depends(require_dealership_owner),  # Only owners can remove users
+    owner_profile: CachedUserProfile = Depends(require_owner),  # Only owners can remove users
     db: AsyncSession = Depends(get_db_session)
 ):
     """
@@ -233,29 +222,37 @@ async def remove_user_from_dealership(
     This deletes the user's profile from the dealership.
     Replaces the legacy /roles/users/{user_id} DELETE endpoint.
     """
+    dealership_id = str(owner_profile.dealership_id)
+    owner_user_id = str(owner_profile.user_id)
+
+    try:
+        target_uuid = uuid.UUID(target_user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user ID format")
+
     try:
         # Don't allow owners to remove themselves
-        if target_user_id == owner_user_id:
+        if target_uuid == owner_profile.user_id:
             raise HTTPException(
                 status_code=400,
                 detail="Cannot remove your own profile. Transfer ownership first."
             )
 
-        # Delete the user profile
-        target_uuid = uuid.UUID(target_user_id)
-        dealership_uuid = uuid.UUID(dealership_id)
-
+        # Delete the user profile; RETURNING tells us whether a row matched
         result = await db.execute(
             delete(UserProfile).where(
                 UserProfile.user_id == target_uuid,
-                UserProfile.dealership_id == dealership_uuid
-            )
+                UserProfile.dealership_id == owner_profile.dealership_id
+            ).returning(UserProfile.id)
         )
+        deleted_id = result.scalar_one_or_none()
         await db.commit()
 
-        if result.rowcount == 0:
+        if deleted_id is None:
             raise HTTPException(status_code=404, detail="User profile not found in this dealership")
 
+        user_profile_cache.pop(str(target_uuid), None)
+
         logger.info(f"User {target_user_id} removed from dealership {dealership_id} by {owner_user_id}")
 
         return {
@@ -265,8 +262,6 @@ async def remove_user_from_dealership(
         }
     except HTTPException:
         raise
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid user ID or dealership ID format")
     except Exception as e:
         logger.error(f"Error removing user {target_user_id} from dealership: {str(e)}")
         raise HTTPException(status_code=500, detail="Error removing user from dealership")
\ No newline at end of file
@@ -1,17 +1,15 @@
 """
 Vonage SMS API routes for sending and receiving SMS messages
 """
-from fastapi import APIRouter, Depends, HTTPException, Form, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from typing import Dict, Any
 import logging
 from datetime import datetime
-import pytz
 
 from maqro_rag import EnhancedRAGService
-from ...api.deps import get_db_session, get_current_user_id, get_user_dealership_id, get_enhanced_rag_services
+from ...core.rate_limit import limiter
+from ...api.deps import get_current_user_id, get_user_dealership_id, get_enhanced_rag_services
+from ...db.session import AsyncSessionLocal
 from ...services.sms_service import sms_service
 from ...services.salesperson_sms_service import salesperson_sms_service
 from ...services.message_flow_service import message_flow_service
@@ -34,11 +32,19 @@ from ...services.ai_services import get_last_customer_message
 
 logger = logging.getLogger(__name__)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
 
 router = APIRouter()
 
+# Parameters Vonage sends with inbound messages and delivery receipts
+_INBOUND_PARAMS = ("msisdn", "to", "text", "messageId")
+_DELIVERY_PARAMS = ("messageId", "status", "err-code", "to")
+
+
+async def _vonage_params(request: Request, keys: tuple[str, ...]) -> Dict[str, Any]:
+    """Read webhook params from the query string (GET) or form body (POST)."""
+    source = request.query_params if request.method == "GET" else await request.form()
+    return {key: source.get(key) for key in keys}
+
 
 @router.post("/send-sms")
 async def send_sms(
@@ -79,39 +85,81 @@ async def send_sms(
         raise HTTPException(status_code=500, detail="Failed to send SMS")
 
 
+async def _process_inbound_sms(
+    normalized_phone: str,
+    message_text: str,
+    enhanced_rag_service: EnhancedRAGService
+):
+    """
+    Route an inbound SMS and send any salesperson reply, after Vonage is acked.
+    
+    Runs on its own session since the request's session is closed by then.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            # Determine which dealership this phone number belongs to
+            dealership_id = await dealership_phone_mapping_service.get_dealership_for_phone(
+                session=db,
+                phone_number=normalized_phone
+            )
+            
+            if not dealership_id:
+                logger.error("Could not determine dealership for phone %s", normalized_phone)
+                return
+            
+            logger.info("Determined dealership %s for phone %s", dealership_id, normalized_phone)
+            
+            # Use the new message flow service to handle the incoming message
+            result = await message_flow_service.process_incoming_message(
+                session=db,
+                from_phone=normalized_phone,
+                message_text=message_text,
+                dealership_id=dealership_id,
+                enhanced_rag_service=enhanced_rag_service,
+                message_source="sms"
+            )
+        
+        # If this was a salesperson message that needs a response, send it
+        if result.get("success") and result.get("message"):
+            # Check if we need to send a response back to the salesperson
+            if result.get("needs_clarification") or result.get("has_pending_approval") is False:
+                sms_result = await sms_service.send_sms(normalized_phone, result["message"])
+                
+                if sms_result["success"]:
+                    logger.info("Sent response to salesperson %s", normalized_phone)
+                else:
+                    logger.error("Failed to send response to salesperson: %s", sms_result["error"])
+    
+    except Exception:
+        # Vonage already got its ack, so it will not retry this message
+        logger.exception("Webhook processing error for %s", normalized_phone)
+
+
 @router.api_route("/webhook", methods=["GET", "POST"])
 @limiter.limit("200/minute")  # High limit for legitimate webhook traffic
 async def vonage_webhook(
     request: Request,
-    db: AsyncSession = Depends(get_db_session),
+    background_tasks: BackgroundTasks,
     enhanced_rag_service: EnhancedRAGService = Depends(get_enhanced_rag_services)
 ):
     """
     Vonage webhook endpoint for receiving inbound SMS messages
     
-    This endpoint:
-    1. Receives incoming SMS from customers
-    2. Looks up existing lead by phone number
-    3. Creates new lead if phone number doesn't exist
-    4. Adds message to conversation history
-    5. Generates AI response using RAG system
-    6. Sends AI response back to customer
+    Acks Vonage as soon as the message is validated (slow responses get
+    retried), then in the background:
+    1. Looks up existing lead by phone number
+    2. Creates new lead if phone number doesn't exist
+    3. Adds message to conversation history
+    4. Generates AI response using RAG system
+    5. Sends AI response back to customer
     """
     try:
-        # Handle both GET (query params) and POST (form data) requests
-        if request.method == "GET":
-            # Vonage sends data as query parameters
-            from_number = request.query_params.get("msisdn")
-            to_number = request.query_params.get("to")
-            message_text = request.query_params.get("text")
-            message_id = request.query_params.get("messageId")
-        else:
-            # POST - Vonage sends form data
-            form_data = await request.form()
-            from_number = form_data.get("msisdn")
-            to_number = form_data.get("to")
-            message_text = form_data.get("text")
-            message_id = form_data.get("messageId")
+        # Vonage sends query parameters (GET) or form data (POST)
+        params = await _vonage_params(request, _INBOUND_PARAMS)
+        from_number = params["msisdn"]
+        to_number = params["to"]
+        message_text = params["text"]
+        message_id = params["messageId"]
         
         logger.info(f"Received webhook: from={from_number}, to={to_number}, text={message_text}")
         
@@ -122,50 +170,12 @@ async def vonage_webhook(
         # Normalize phone number
         normalized_phone = sms_service.normalize_phone_number(from_number)
         
-        # Determine which dealership this phone number belongs to
-        dealership_id = await dealership_phone_mapping_service.get_dealership_for_phone(
-            session=db,
-            phone_number=normalized_phone
-        )
+        background_tasks.add_task(_process_inbound_sms, normalized_phone, message_text, enhanced_rag_service)
         
-        if not dealership_id:
-            logger.error(f"Could not determine dealership for phone {normalized_phone}")
-            return {"status": "error", "message": "Unable to determine dealership for this phone number"}
-        
-        logger.info(f"Determined dealership {dealership_id} for phone {normalized_phone}")
-        
-        # Use the new message flow service to handle the incoming message
-        result = await message_flow_service.process_incoming_message(
-            session=db,
-            from_phone=normalized_phone,
-            message_text=message_text,
-            dealership_id=dealership_id,
-            enhanced_rag_service=enhanced_rag_service,
-            message_source="sms"
-        )
-        
-        # If this was a salesperson message that needs a response, send it
-        if result.get("success") and result.get("message"):
-            # Check if we need to send a response back to the salesperson
-            if result.get("needs_clarification") or result.get("has_pending_approval") is False:
-                sms_result = await sms_service.send_sms(normalized_phone, result["message"])
-                
-                if sms_result["success"]:
-                    logger.info(f"Sent response to salesperson {normalized_phone}")
-                    result["response_sent_to_salesperson"] = True
-                else:
-                    logger.error(f"Failed to send response to salesperson: {sms_result['error']}")
-                    result["response_sent_to_salesperson"] = False
-                    result["salesperson_response_error"] = sms_result["error"]
-        
-        return result
+        return {"status": "queued", "message_id": message_id}
             
     except Exception as e:
-        logger.error(f"Webhook processing error: {e}")
-        logger.error(f"Error type: {type(e).__name__}")
-        logger.error(f"Error details: {str(e)}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Webhook processing error")
         return {"status": "error", "message": f"Internal processing error: {str(e)}"}
 
 
@@ -178,24 +188,12 @@ async def vonage_delivery_webhook(request: Request):
     Vonage sends delivery receipts here when SMS messages are delivered, failed, etc.
     """
     try:
-        # Handle both GET (query params) and POST (form data) requests
-        if request.method == "GET":
-            # Vonage sends data as query parameters
-            message_id = request.query_params.get("messageId")
-            status = request.query_params.get("status")
-            err_code = request.query_params.get("err-code")
-            to = request.query_params.get("to")
-            network_code = request.query_params.get("network-code")
-            price = request.query_params.get("price")
-        else:
-            # POST - Vonage sends form data
-            form_data = await request.form()
-            message_id = form_data.get("messageId")
-            status = form_data.get("status")
-            err_code = form_data.get("err-code")
-            to = form_data.get("to")
-            network_code = form_data.get("network-code")
-            price = form_data.get("price")
+        # Vonage sends query parameters (GET) or form data (POST)
+        params = await _vonage_params(request, _DELIVERY_PARAMS)
+        message_id = params["messageId"]
+        status = params["status"]
+        err_code = params["err-code"]
+        to = params["to"]
         
         logger.info(f"Delivery receipt: messageId={message_id}, status={status}, to={to}, err_code={err_code}")
         
@@ -216,20 +214,12 @@ async def vonage_simple_webhook(request: Request):
     Just receives a message and sends back a simple test response
     """
     try:
-        # Handle both GET (query params) and POST (form data) requests
-        if request.method == "GET":
-            # Vonage sends data as query parameters
-            from_number = request.query_params.get("msisdn")
-            to_number = request.query_params.get("to")
-            message_text = request.query_params.get("text")
-            message_id = request.query_params.get("messageId")
-        else:
-            # POST - Vonage sends form data
-            form_data = await request.form()
-            from_number = form_data.get("msisdn")
-            to_number = form_data.get("to")
-            message_text = form_data.get("text")
-            message_id = form_data.get("messageId")
+        # Vonage sends query parameters (GET) or form data (POST)
+        params = await _vonage_params(request, _INBOUND_PARAMS)
+        from_number = params["msisdn"]
+        to_number = params["to"]
+        message_text = params["text"]
+        message_id = params["messageId"]
         
         logger.info(f"Simple webhook received: from={from_number}, text={message_text}")
         
@@ -30,6 +30,9 @@ class Settings(BaseSettings):
     # Resend Email Configuration
     resend_api_key: str
 
+    # Rate limit storage (memory:// is per process; use redis://... with multiple workers)
+    rate_limit_storage_uri: str = "memory://"
+
     rag_config_path: str = "config.yaml"
     rag_index_name: str = "vehicle_index"
 
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -6,8 +7,11 @@ from maqro_rag import Config, EnhancedRAGService
 from maqro_rag.db_retriever import DatabaseRAGRetriever
 from maqro_backend.core.config import settings
 from maqro_backend.services.ai_services import analyze_conversation_context
-from maqro_backend.db.session import get_db
+from maqro_backend.db.session import get_db, close_db_connections
 from maqro_backend.crud import ensure_embeddings_for_dealership, get_rag_stats
+from maqro_backend.services.background_tasks import expire_invites_periodically
+from maqro_backend.services.stripe_event_service import retry_pending_events_periodically
+from maqro_backend.services.telnyx_service import telnyx_service
 # from maqro_backend.db.session import create_tables  # Removed - tables managed by Supabase
 
 
@@ -25,7 +29,7 @@ async def lifespan(app: FastAPI):
 
     global db_retriever, enhanced_rag_service
     logger.info("Starting up Maqro API with Database RAG...")
-    
+
     # 1. Load RAG configuration
     config = Config.from_yaml(settings.rag_config_path)
     
@@ -65,11 +69,22 @@ async def lifespan(app: FastAPI):
     
     # 6. Database tables are managed by Supabase
     logger.info("Database connection ready (tables managed by Supabase)")
+
+    # 7. Periodically flip stale pending invites to 'expired'
+    invite_expiry_task = asyncio.create_task(expire_invites_periodically())
+
+    # 8. Re-apply stored Stripe events that failed or were cut off by a restart
+    stripe_retry_task = asyncio.create_task(retry_pending_events_periodically())
+
     logger.info("🚀 Maqro API startup complete with Database RAG")
     
     yield
     
     logger.info("Shutting down...")
+    invite_expiry_task.cancel()
+    stripe_retry_task.cancel()
+    await telnyx_service.aclose()
+    await close_db_connections()
 
 
 
@@ -0,0 +1,17 @@
+"""
+Shared slowapi rate limiter
+"""
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from .config import settings
+
+
+# One limiter for the whole app. With the default memory:// storage every
+# worker counts on its own; point RATE_LIMIT_STORAGE_URI at Redis
+# (redis://host:6379/0) so limits hold across `uvicorn --workers N`.
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=settings.rate_limit_storage_uri,
+    strategy="moving-window",
+)
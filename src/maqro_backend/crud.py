@@ -1,24 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update
+from sqlalchemy import Row, exists, select, func, update, insert, tuple_
 from .db.models import Lead, Conversation, Inventory, UserProfile, Dealership, PendingApproval, Role, UserRole, Invite
 from .schemas.conversation import MessageCreate
 from .schemas.lead import LeadCreate
 from .utils.phone_utils import normalize_phone_number
+from .utils.ttl_cache import TTLCache
+import re
+import secrets
 import uuid
 from typing import List, Optional
-from datetime import datetime
-import pytz
+from datetime import datetime, timedelta, timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
+# dealership_id -> name; names change rarely and update_dealership invalidates
+dealership_name_cache = TTLCache(maxsize=1024, ttl=300)
+
 # =============================================================================
 # LEAD CRUD OPERATIONS
 # =============================================================================
 
-async def create_lead(*, session: AsyncSession, lead_in: LeadCreate, user_id: str, dealership_id: str) -> Lead:
-    """Create a new lead with Supabase compatibility"""
-    
+def _build_lead(lead_in: LeadCreate, user_id: str, dealership_id: str) -> Lead:
+    """Build (but don't add) a Lead row from LeadCreate input"""
     # Auto-generate name if not provided
     lead_name = lead_in.name
     if not lead_name:
@@ -36,20 +40,44 @@ async def create_lead(*, session: AsyncSession, lead_in: LeadCreate, user_id: st
     # Normalize phone number before storage
     normalized_phone = normalize_phone_number(lead_in.phone) if lead_in.phone else None
     
-    db_obj = Lead(
+    return Lead(
         name=lead_name,
         email=lead_in.email,
         phone=normalized_phone,
         car_interest=getattr(lead_in, 'car_interest', 'Unknown'),  # Default if not provided
         source=getattr(lead_in, 'source', 'Website'),  # Default if not provided
         status="new",  # All leads start as "new"
-        last_contact_at=datetime.now(pytz.timezone('utc')),  # Current time in UTC
+        last_contact_at=datetime.now(timezone.utc),  # Current time in UTC
         message=getattr(lead_in, 'message', ''),  # Initial message
         max_price=getattr(lead_in, 'max_price', None),  # Maximum price range
         assigned_user_id=uuid.UUID(user_id) if user_id else None,  # Assigned salesperson (nullable)
         dealership_id=uuid.UUID(dealership_id)  # Required dealership ID
     )
+
+
+async def create_lead(*, session: AsyncSession, lead_in: LeadCreate, user_id: str, dealership_id: str) -> Lead:
+    """Create a new lead with Supabase compatibility"""
+    db_obj = _build_lead(lead_in, user_id, dealership_id)
+    session.add(db_obj)
+    await session.commit()
+    await session.refresh(db_obj)
+    return db_obj
+
+
+async def create_lead_with_message(
+    *, session: AsyncSession, lead_in: LeadCreate, user_id: str | None, dealership_id: str, message: str, sender: str
+) -> Lead:
+    """
+    Create a lead together with its first conversation message
+
+    Both rows are written in one transaction (one commit instead of one
+    per row), so a lead never exists without the message that created it.
+    """
+    db_obj = _build_lead(lead_in, user_id, dealership_id)
     session.add(db_obj)
+    # Flush to get the server-generated lead id for the message row
+    await session.flush()
+    session.add(Conversation(lead_id=db_obj.id, message=message, sender=sender))
     await session.commit()
     await session.refresh(db_obj)
     return db_obj
@@ -169,12 +197,9 @@ async def get_leads_with_conversations_summary_by_salesperson(
             if not date_obj:
                 return "Never"
             
-            from datetime import datetime
-            import pytz
-            
-            now = datetime.now(pytz.UTC)
+            now = datetime.now(timezone.utc)
             if date_obj.tzinfo is None:
-                date_obj = pytz.UTC.localize(date_obj)
+                date_obj = date_obj.replace(tzinfo=timezone.utc)
             
             diff = now - date_obj
             diff_mins = int(diff.total_seconds() // 60)
@@ -501,6 +526,24 @@ async def get_dealership_by_id(*, session: AsyncSession, dealership_id: str) ->
         return None
 
 
+async def get_dealership_name(*, session: AsyncSession, dealership_id: str) -> Optional[str]:
+    """Get a dealership's name, served from a short-lived cache since names rarely change"""
+    cache_key = str(dealership_id)
+    name = dealership_name_cache.get(cache_key)
+    if name is not None:
+        return name
+    try:
+        dealership_uuid = uuid.UUID(cache_key)
+    except (ValueError, TypeError):
+        return None
+    name = await session.scalar(
+        select(Dealership.name).where(Dealership.id == dealership_uuid)
+    )
+    if name is not None:
+        dealership_name_cache.set(cache_key, name)
+    return name
+
+
 async def update_dealership(*, session: AsyncSession, dealership_id: str, **kwargs) -> Dealership | None:
     """Update dealership information"""
     dealership = await get_dealership_by_id(session=session, dealership_id=dealership_id)
@@ -513,6 +556,7 @@ async def update_dealership(*, session: AsyncSession, dealership_id: str, **kwar
     
     await session.commit()
     await session.refresh(dealership)
+    dealership_name_cache.pop(str(dealership.id), None)
     return dealership
 
 
@@ -557,6 +601,18 @@ async def get_user_profile_by_user_id(*, session: AsyncSession, user_id: str) ->
         return None
 
 
+async def user_profile_exists(*, session: AsyncSession, user_id: str) -> bool:
+    """Whether a user already has a profile, without loading the row"""
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except (ValueError, TypeError):
+        return False
+    result = await session.execute(
+        select(exists().where(UserProfile.user_id == user_uuid))
+    )
+    return bool(result.scalar())
+
+
 async def get_user_profiles_by_dealership(*, session: AsyncSession, dealership_id: str) -> list[UserProfile]:
     """Get all user profiles for a dealership"""
     try:
@@ -573,12 +629,9 @@ async def get_user_profiles_by_dealership(*, session: AsyncSession, dealership_i
 
 async def update_user_profile(*, session: AsyncSession, user_id: str, **kwargs) -> UserProfile | None:
     """Update user profile information"""
-    profile = await get_user_profile_by_user_id(session=session, user_id=user_id)
-    if not profile:
-        return None
-    
+    values = {}
     for field, value in kwargs.items():
-        if hasattr(profile, field) and value is not None:
+        if field in UserProfile.__table__.columns and value is not None:
             if field == 'dealership_id':
                 # Handle dealership_id as UUID
                 try:
@@ -588,10 +641,26 @@ async def update_user_profile(*, session: AsyncSession, user_id: str, **kwargs)
             elif field == 'phone':
                 # Normalize phone number
                 value = normalize_phone_number(value)
-            setattr(profile, field, value)
+            values[field] = value
+    
+    if not values:
+        return await get_user_profile_by_user_id(session=session, user_id=user_id)
     
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except (ValueError, TypeError):
+        return None
+    
+    # One UPDATE ... RETURNING instead of load, flush and refresh
+    result = await session.execute(
+        update(UserProfile)
+        .where(UserProfile.user_id == user_uuid)
+        .values(**values)
+        .returning(UserProfile)
+        .execution_options(populate_existing=True)
+    )
+    profile = result.scalar_one_or_none()
     await session.commit()
-    await session.refresh(profile)
     return profile
 
 
@@ -641,7 +710,7 @@ async def create_pending_approval(
                 PendingApproval.user_id == user_uuid,
                 PendingApproval.status == "pending"
             )
-            .values(status="expired", updated_at=datetime.now(pytz.UTC))
+            .values(status="expired", updated_at=datetime.now(timezone.utc))
         )
         
         # Create new approval
@@ -680,7 +749,7 @@ async def get_pending_approval_by_user(
         query = select(PendingApproval).where(
             PendingApproval.user_id == user_uuid,
             PendingApproval.status == "pending",
-            PendingApproval.expires_at > datetime.now(pytz.UTC)
+            PendingApproval.expires_at > datetime.now(timezone.utc)
         )
         
         # Add dealership filter if provided
@@ -709,7 +778,7 @@ async def update_approval_status(
             return None
         
         approval.status = status
-        approval.updated_at = datetime.now(pytz.UTC)
+        approval.updated_at = datetime.now(timezone.utc)
         
         await session.commit()
         await session.refresh(approval)
@@ -739,7 +808,7 @@ async def expire_pending_approvals_for_user(
         count = 0
         for approval in approvals:
             approval.status = "expired"
-            approval.updated_at = datetime.now(pytz.UTC)
+            approval.updated_at = datetime.now(timezone.utc)
             count += 1
         
         if count > 0:
@@ -758,7 +827,7 @@ async def cleanup_expired_approvals(*, session: AsyncSession) -> int:
         result = await session.execute(
             select(PendingApproval).where(
                 PendingApproval.status == "pending",
-                PendingApproval.expires_at <= datetime.now(pytz.UTC)
+                PendingApproval.expires_at <= datetime.now(timezone.utc)
             )
         )
         approvals = result.scalars().all()
@@ -767,7 +836,7 @@ async def cleanup_expired_approvals(*, session: AsyncSession) -> int:
         count = 0
         for approval in approvals:
             approval.status = "expired"
-            approval.updated_at = datetime.now(pytz.UTC)
+            approval.updated_at = datetime.now(timezone.utc)
             count += 1
         
         if count > 0:
@@ -1116,6 +1185,20 @@ async def user_has_permission_level(
 # INVITE CRUD OPERATIONS
 # =============================================================================
 
+# Invite tokens come from secrets.token_urlsafe(32): 43 URL-safe base64 chars
+_INVITE_TOKEN_RE = re.compile(r"[A-Za-z0-9_-]{43}")
+
+
+def _is_well_formed_invite_token(token: str) -> bool:
+    """Cheap shape check so malformed tokens never reach the database"""
+    return isinstance(token, str) and _INVITE_TOKEN_RE.fullmatch(token) is not None
+
+
+def normalize_invite_email(email: str) -> str:
+    """Canonical form invites are stored under, so every path compares the same key"""
+    return email.strip().lower()
+
+
 async def create_invite(
     *, 
     session: AsyncSession, 
@@ -1127,8 +1210,6 @@ async def create_invite(
 ) -> Invite:
     """Create a new invite for a salesperson"""
     try:
-        from .db.models import Invite
-        
         dealership_uuid = uuid.UUID(dealership_id)
         invited_by_uuid = uuid.UUID(invited_by)
         
@@ -1138,16 +1219,14 @@ async def create_invite(
             raise ValueError(f"Invalid role '{role_name}'. Must be one of: {valid_roles}")
         
         # Generate a unique token
-        import secrets
         token = secrets.token_urlsafe(32)
         
         # Calculate expiration
-        from datetime import datetime, timedelta
-        expires_at = datetime.utcnow() + timedelta(days=expires_in_days)
+        expires_at = datetime.now(timezone.utc) + timedelta(days=expires_in_days)
         
         invite = Invite(
             dealership_id=dealership_uuid,
-            email=email.lower(),
+            email=normalize_invite_email(email),
             token_hash=token,
             role=role_name,
             invited_by=invited_by_uuid,
@@ -1164,15 +1243,79 @@ async def create_invite(
         raise ValueError(f"Invalid data format: {str(e)}")
 
 
-async def get_invite_by_token(
+async def create_invites_bulk(
+    *, 
+    session: AsyncSession, 
+    dealership_id: str, 
+    emails: List[str], 
+    role_name: str, 
+    invited_by: str,
+    expires_in_days: int = 7
+) -> tuple[List[Invite], List[str]]:
+    """
+    Create invites for several emails with a single multi-row INSERT.
+
+    Emails that already have a pending invite for the dealership are
+    skipped rather than failing the batch on unique_pending_invite (a
+    DEFERRABLE constraint, so ON CONFLICT can't target it). Returns the
+    created invites and the skipped emails.
+    """
+    try:
+        dealership_uuid = uuid.UUID(dealership_id)
+        invited_by_uuid = uuid.UUID(invited_by)
+        
+        valid_roles = ['owner', 'manager', 'salesperson', 'admin']
+        if role_name not in valid_roles:
+            raise ValueError(f"Invalid role '{role_name}'. Must be one of: {valid_roles}")
+        
+        expires_at = datetime.now(timezone.utc) + timedelta(days=expires_in_days)
+        
+        # Normalize and de-duplicate while keeping request order
+        unique_emails = list(dict.fromkeys(normalize_invite_email(email) for email in emails))
+        
+        pending = set((await session.scalars(
+            select(Invite.email).where(
+                Invite.dealership_id == dealership_uuid,
+                Invite.status == "pending",
+                Invite.email.in_(unique_emails),
+            )
+        )).all())
+        already_invited = [email for email in unique_emails if email in pending]
+        new_emails = [email for email in unique_emails if email not in pending]
+        if not new_emails:
+            return [], already_invited
+        
+        rows = [
+            {
+                "dealership_id": dealership_uuid,
+                "email": email,
+                "token_hash": secrets.token_urlsafe(32),
+                "role": role_name,
+                "invited_by": invited_by_uuid,
+                "expires_at": expires_at,
+                "status": "pending",
+            }
+            for email in new_emails
+        ]
+        
+        result = await session.scalars(insert(Invite).returning(Invite), rows)
+        invites = list(result.all())
+        await session.commit()
+        
+        return invites, already_invited
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid data format: {str(e)}")
+
+
+async def get_invite_by_token_any_status(
     *, 
     session: AsyncSession, 
     token: str
 ) -> Invite | None:
-    """Get an invite by its token"""
+    """Get an invite by its token regardless of status or expiry"""
+    if not _is_well_formed_invite_token(token):
+        return None
     try:
-        from .db.models import Invite
-        
         result = await session.execute(
             select(Invite).where(Invite.token_hash == token)
         )
@@ -1181,6 +1324,88 @@ async def get_invite_by_token(
         return None
 
 
+def _valid_invite_filters():
+    """WHERE predicates for an invite that can still be used"""
+    return (
+        Invite.status == "pending",
+        (Invite.expires_at.is_(None)) | (Invite.expires_at > func.now()),
+    )
+
+
+async def get_valid_invite_by_token(
+    *, 
+    session: AsyncSession, 
+    token: str
+) -> Invite | None:
+    """
+    Get a pending, unexpired invite by its token.
+
+    Status and expiry are checked in the WHERE clause, so used, cancelled
+    and expired invites come back as None without a Python-side check.
+    """
+    if not _is_well_formed_invite_token(token):
+        return None
+    try:
+        result = await session.execute(
+            select(Invite).where(Invite.token_hash == token, *_valid_invite_filters())
+        )
+        return result.scalar_one_or_none()
+    except Exception:
+        return None
+
+
+async def get_invite_with_dealership_by_token(
+    *, 
+    session: AsyncSession, 
+    token: str,
+    valid_only: bool = False
+) -> tuple[Invite, Optional[str]] | None:
+    """
+    Get an invite and its dealership's name by token in a single query.
+
+    With ``valid_only`` the same pending/unexpired predicates as
+    get_valid_invite_by_token are applied.
+    """
+    if not _is_well_formed_invite_token(token):
+        return None
+    try:
+        stmt = (
+            select(Invite, Dealership.name)
+            .outerjoin(Dealership, Dealership.id == Invite.dealership_id)
+            .where(Invite.token_hash == token)
+        )
+        if valid_only:
+            stmt = stmt.where(*_valid_invite_filters())
+        result = await session.execute(stmt)
+        return result.first()
+    except Exception:
+        return None
+
+
+async def claim_invite(
+    *, 
+    session: AsyncSession, 
+    token: str
+) -> Invite | None:
+    """
+    Atomically mark a pending, unexpired invite as accepted.
+
+    A single UPDATE ... WHERE status = 'pending' ... RETURNING, so two
+    concurrent acceptances of the same token can't both succeed. Returns
+    None if the token is unknown, already used, cancelled or expired.
+    Does not commit; the caller commits together with its own writes.
+    """
+    if not _is_well_formed_invite_token(token):
+        return None
+    result = await session.execute(
+        update(Invite)
+        .where(Invite.token_hash == token, *_valid_invite_filters())
+        .values(status="accepted", used_at=func.now())
+        .returning(Invite)
+    )
+    return result.scalar_one_or_none()
+
+
 async def get_invite_by_id(
     *, 
     session: AsyncSession, 
@@ -1197,19 +1422,50 @@ async def get_invite_by_id(
 async def get_invites_by_dealership(
     *, 
     session: AsyncSession, 
-    dealership_id: str
-) -> List[Invite]:
-    """Get all invites for a dealership"""
+    dealership_id: str,
+    status: Optional[str] = None,
+    before: Optional[tuple[datetime, uuid.UUID]] = None,
+    limit: Optional[int] = None
+) -> List[Row]:
+    """
+    Get invites for a dealership, newest first, along with the inviter's name.
+
+    Only the listed columns are selected, labelled to match
+    InviteListResponse, and the inviter's profile is LEFT JOINed so callers
+    can render "invited by" without a follow-up lookup per invite.
+
+    Pagination is keyset-based: ``before`` is the (created_at, id) of the
+    last row of the previous page. id breaks ties between invites created
+    in the same transaction.
+    """
     try:
-        from .db.models import Invite
-        
         dealership_uuid = uuid.UUID(dealership_id)
         
-        result = await session.execute(
-            select(Invite).where(Invite.dealership_id == dealership_uuid)
-            .order_by(Invite.created_at.desc())
+        stmt = (
+            select(
+                Invite.id,
+                Invite.email,
+                Invite.role.label("role_name"),
+                Invite.invited_by,
+                Invite.created_at,
+                Invite.expires_at,
+                Invite.status,
+                Invite.token_hash.label("token"),
+                UserProfile.full_name.label("inviter_name"),
+            )
+            .outerjoin(UserProfile, UserProfile.user_id == Invite.invited_by)
+            .where(Invite.dealership_id == dealership_uuid)
+            .order_by(Invite.created_at.desc(), Invite.id.desc())
         )
-        return result.scalars().all()
+        if status:
+            stmt = stmt.where(Invite.status == status)
+        if before:
+            stmt = stmt.where(tuple_(Invite.created_at, Invite.id) < tuple_(*before))
+        if limit:
+            stmt = stmt.limit(limit)
+        
+        result = await session.execute(stmt)
+        return result.all()
     except (ValueError, TypeError):
         return []
 
@@ -1223,8 +1479,6 @@ async def update_invite_status(
 ) -> Invite | None:
     """Update an invite's status"""
     try:
-        from .db.models import Invite
-        
         invite_uuid = uuid.UUID(invite_id)
         
         result = await session.execute(
@@ -1247,14 +1501,11 @@ async def update_invite_status(
 async def expire_old_invites(*, session: AsyncSession) -> int:
     """Expire all old invites and return count of expired invites"""
     try:
-        from .db.models import Invite
-        from datetime import datetime
-        
         result = await session.execute(
             update(Invite)
             .where(
                 Invite.status == "pending",
-                Invite.expires_at < datetime.utcnow()
+                Invite.expires_at < func.now()
             )
             .values(status="expired")
         )
@@ -281,3 +281,16 @@ class SubscriptionEvent(Base):
 
     # Relationships
     dealership_subscription = relationship("DealershipSubscription", back_populates="subscription_events")
+
+
+class StripeWebhookEvent(Base):
+    """Raw Stripe webhook event, stored before it is acknowledged and applied"""
+    __tablename__ = "stripe_webhook_events"
+
+    stripe_event_id = Column(Text, primary_key=True)
+    event_type = Column(Text, nullable=False)
+    payload = Column(JSON, nullable=False)
+    received_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    processed_at = Column(DateTime(timezone=True))  # NULL until the event has been applied
+    attempts = Column(Integer, nullable=False, server_default="0")
+    last_error = Column(Text)
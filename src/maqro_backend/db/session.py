@@ -6,6 +6,7 @@ from pathlib import Path
 import ssl
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import NullPool
 from loguru import logger
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 
@@ -149,16 +150,36 @@ if not is_local:
 
     connect_args = {"ssl": ssl_context}
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,  # Set to True for SQL debugging
-    pool_size=20,  # Number of connections to maintain
-    max_overflow=30,  # Additional connections when pool is full
-    pool_pre_ping=True,  # Validate connections before use
-    pool_recycle=3600,  # Recycle connections every hour
-    pool_timeout=30,  # Timeout for getting connection from pool
-    connect_args=connect_args,
-)
+# Pool sizing is per worker process; tune via env to stay under the database's connection limit
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Behind PgBouncer in transaction mode (e.g. the Supabase pooler on port 6543)
+# the external pooler owns the connections: skip the local pool, and turn off
+# asyncpg's prepared statement cache since statements can't outlive a transaction
+USE_NULL_POOL = os.getenv("DB_USE_NULL_POOL", "false").lower() in {"1", "true", "yes"}
+
+if USE_NULL_POOL:
+    logger.info("DB pooling delegated to external pooler (DB_USE_NULL_POOL=true)")
+    engine = create_async_engine(
+        DATABASE_URL,
+        echo=False,
+        poolclass=NullPool,
+        connect_args={**connect_args, "statement_cache_size": 0},
+    )
+else:
+    engine = create_async_engine(
+        DATABASE_URL,
+        echo=False,  # Set to True for SQL debugging
+        pool_size=POOL_SIZE,  # Number of connections to maintain
+        max_overflow=MAX_OVERFLOW,  # Additional connections when pool is full
+        pool_pre_ping=True,  # Validate connections before use
+        pool_recycle=POOL_RECYCLE,  # Recycle connections before server-side idle timeouts (30 min default)
+        pool_timeout=POOL_TIMEOUT,  # Seconds to wait for a pooled connection before failing
+        connect_args=connect_args,
+    )
 
 # Session factory with connection pooling
 AsyncSessionLocal = async_sessionmaker(
@@ -171,7 +192,11 @@ AsyncSessionLocal = async_sessionmaker(
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Get database session with proper connection management."""
+    """Get database session with proper connection management.
+
+    The session is opened with ``async with`` so its connection goes back to
+    the pool when the request finishes, even if the handler raised.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -1,22 +1,29 @@
+import atexit
 import logging
-from fastapi import FastAPI, Request
+import logging.handlers
+import queue
+import orjson
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from .core.config import settings
 from .core.lifespan import lifespan
+from .core.rate_limit import limiter
 from .api.routes import api_router
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging: handlers only enqueue records, a listener thread does the I/O
+# so log writes never block the event loop. force=True because modules imported
+# above already called basicConfig, which left a plain stderr handler on root
+_log_queue = queue.SimpleQueue()
+logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(_log_queue)], force=True)
+_log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 
-# Create rate limiter instance
-limiter = Limiter(key_func=get_remote_address)
-
 app = FastAPI(
     title=settings.title,
     version=settings.version,
@@ -51,6 +58,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # invite list pagination
 )
 
 # Include all API routes
@@ -70,6 +78,8 @@ async def startup_event():
     logger.info(f"🚀 {settings.title} v{settings.version} started successfully")
 
 # Root endpoint
+_ROOT_JSON = orjson.dumps({"message": "Maqro Dealership API", "version": settings.version})
+
 @app.get("/")
 async def root():
-    return {"message": "Maqro Dealership API", "version": settings.version}
+    return Response(content=_ROOT_JSON, media_type="application/json")
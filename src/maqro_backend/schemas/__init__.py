@@ -18,10 +18,12 @@ from .settings import (
     UserSettingResponse,
     UserSettingUpdate,
     UserSettingCreate,
+    UserSettingsBatchRequest,
     EffectiveSettingResponse,
     SettingsValidationError
 )
 from .roles import (
+    RoleName,
     RoleResponse,
     UserRoleResponse,
     UserRoleCreate,
@@ -64,10 +66,12 @@ __all__ = [
     "UserSettingResponse",
     "UserSettingUpdate",
     "UserSettingCreate",
+    "UserSettingsBatchRequest",
     "EffectiveSettingResponse",
     "SettingsValidationError",
     
     # Role schemas
+    "RoleName",
     "RoleResponse",
     "UserRoleResponse",
     "UserRoleCreate",
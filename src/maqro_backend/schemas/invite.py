@@ -2,8 +2,12 @@
 Invite schemas for salesperson invitations
 """
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from typing import Dict, List, Optional
+from uuid import UUID
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+
+# Upper bound on invites created by a single bulk request
+MAX_BULK_INVITES = 100
 
 
 class InviteCreate(BaseModel):
@@ -15,18 +19,31 @@ class InviteCreate(BaseModel):
 
 class InviteResponse(BaseModel):
     """Schema for invite response"""
-    id: str
-    dealership_id: str
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    dealership_id: UUID
     email: str
     token: str
     role_name: str
-    invited_by: str
+    invited_by: UUID
     created_at: datetime
     expires_at: datetime
     status: str
 
-    class Config:
-        from_attributes = True
+
+class BulkInviteCreate(BaseModel):
+    """Schema for creating several invites with the same role at once"""
+    emails: List[EmailStr] = Field(..., min_length=1, max_length=MAX_BULK_INVITES)
+    role_name: str
+    expires_in_days: Optional[int] = 7
+
+
+class BulkInviteResponse(BaseModel):
+    """Schema for bulk invite response"""
+    invites: List[InviteResponse]
+    email_results: Dict[str, bool]  # email -> whether the invite email was sent
+    already_invited: List[str] = []  # emails skipped because a pending invite exists
 
 
 class InviteAccept(BaseModel):
@@ -37,6 +54,13 @@ class InviteAccept(BaseModel):
     phone: Optional[str] = None
 
 
+class InviteComplete(BaseModel):
+    """Schema for completing an invite as an already authenticated user"""
+    token: str = Field(..., min_length=1)
+    full_name: Optional[str] = None
+    phone: Optional[str] = None
+
+
 class SendInviteEmailRequest(BaseModel):
     """Schema for sending invite email"""
     email: EmailStr
@@ -44,15 +68,15 @@ class SendInviteEmailRequest(BaseModel):
 
 
 class InviteListResponse(BaseModel):
-    """Schema for listing invites"""
-    id: str
+    """Schema for listing invites, validated straight from query rows"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
     email: str
     role_name: str
-    invited_by: str
+    invited_by: UUID
     created_at: datetime
     expires_at: datetime
     status: str
     token: str  # Added token for copy-link functionality
-
-    class Config:
-        from_attributes = True
+    inviter_name: Optional[str] = None
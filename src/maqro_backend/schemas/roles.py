@@ -2,9 +2,12 @@
 Role and permission schemas for API validation
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 
+# System role names; validated by pydantic before handlers run
+RoleName = Literal["owner", "manager", "salesperson"]
+
 
 class RoleBase(BaseModel):
     """Base role model"""
@@ -47,12 +50,12 @@ class UserRoleResponse(BaseModel):
 class UserRoleCreate(BaseModel):
     """Create model for user role assignments"""
     user_id: str = Field(..., description="User UUID as string")
-    role_name: str = Field(..., description="Role name (owner, manager, salesperson)")
+    role_name: RoleName = Field(..., description="Role name (owner, manager, salesperson)")
 
 
 class UserRoleUpdate(BaseModel):
     """Update model for user role assignments"""
-    role_name: str = Field(..., description="New role name (owner, manager, salesperson)")
+    role_name: RoleName = Field(..., description="New role name (owner, manager, salesperson)")
 
 
 class UserWithRoleResponse(BaseModel):
@@ -2,20 +2,17 @@
 Settings schemas for API validation
 """
 from pydantic import BaseModel, Field
-from typing import Any, Optional
+from typing import Any, List, Optional
 from datetime import datetime
 
 
 class SettingDefinitionResponse(BaseModel):
     """Response model for setting definitions"""
     key: str
-    data_type: str
+    scope: str
     description: Optional[str] = None
     default_value: Optional[Any] = None
-    allowed_values: Optional[list] = None
-    is_dealership_level: bool = True
-    is_user_level: bool = True
-    created_at: datetime
+    is_sensitive: bool = False
     
     model_config = {
         "from_attributes": True
@@ -74,6 +71,11 @@ class UserSettingCreate(BaseModel):
     setting_value: Any = Field(..., description="Setting value")
 
 
+class UserSettingsBatchRequest(BaseModel):
+    """Request model for resolving several settings at once"""
+    keys: List[str] = Field(..., min_length=1, max_length=100, description="Setting keys to resolve")
+
+
 class EffectiveSettingResponse(BaseModel):
     """Response model for resolved setting values"""
     key: str
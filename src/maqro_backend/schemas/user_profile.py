@@ -1,12 +1,20 @@
 """
 User profile schemas for Supabase integration
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, BeforeValidator, Field
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Any, Optional
 from .roles import RoleResponse
 
 
+def _id_to_str(value: Any) -> Any:
+    """Let UUID columns validate into the string id fields"""
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+IdStr = Annotated[str, BeforeValidator(_id_to_str)]
+
+
 class UserProfileBase(BaseModel):
     full_name: Optional[str] = None
     phone: Optional[str] = None
@@ -29,9 +37,9 @@ class UserProfileUpdate(BaseModel):
 
 class UserProfileResponse(UserProfileBase):
     """Response model for user profiles (Supabase compatible)"""
-    id: str = Field(..., description="UUID as string")
-    user_id: str = Field(..., description="User UUID as string")
-    dealership_id: Optional[str] = Field(None, description="Dealership UUID as string")
+    id: IdStr = Field(..., description="UUID as string")
+    user_id: IdStr = Field(..., description="User UUID as string")
+    dealership_id: Optional[IdStr] = Field(None, description="Dealership UUID as string")
     created_at: datetime
     updated_at: datetime
     model_config = {
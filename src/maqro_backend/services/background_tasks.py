@@ -10,7 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
 from ..db.session import get_db
-from ..crud import ensure_embeddings_for_dealership
+from ..crud import ensure_embeddings_for_dealership, expire_old_invites
 
 
 class BackgroundTaskManager:
@@ -122,3 +122,22 @@ async def get_task_status(task_id: str) -> Optional[Dict[str, Any]]:
 async def cleanup_background_tasks():
     """Clean up old background tasks."""
     await task_manager.cleanup_old_tasks()
+
+
+async def expire_invites_periodically(interval_seconds: int = 60):
+    """
+    Mark pending invites past their expiry as expired, every interval_seconds.
+
+    Invite lookups already filter on expires_at in SQL, so this only keeps
+    the stored status accurate for listings. Runs until cancelled.
+    """
+    while True:
+        try:
+            async for session in get_db():
+                expired_count = await expire_old_invites(session=session)
+                if expired_count:
+                    logger.info(f"Expired {expired_count} pending invites")
+                break
+        except Exception as e:
+            logger.error(f"Error expiring old invites: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -5,15 +5,47 @@ This service handles mapping phone numbers to dealerships for proper data isolat
 in multi-dealership environments.
 """
 
+import json
 import logging
+import uuid
 from typing import Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, text
 from ..db.models import Dealership, Lead
 from ..utils.phone_utils import normalize_phone_number
+from ..utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# normalized phone -> dealership id, for lookups resolved from a lead or an
+# integration_config mapping. The default-dealership fallback is never cached
+# so a lead or mapping created later is picked up on the next message.
+# Mapping writes clear the whole cache since they can affect any phone.
+dealership_phone_cache = TTLCache(maxsize=1024, ttl=300)
+
+# Single slot: normalized phone -> dealership id for every number configured in
+# integration_config. Built with one query and shared by all lookups, so a
+# phone with no lead no longer scans every dealership's config per message.
+_config_phone_index_cache = TTLCache(maxsize=1, ttl=300)
+
+# integration_config sections whose phone_numbers route inbound messages
+_PHONE_INTEGRATIONS = ("whatsapp", "vonage")
+
+# Replaces integration_config[<integration_type>]["phone_numbers"] in a single statement
+_SET_PHONE_NUMBERS_SQL = text(
+    """
+    UPDATE dealerships
+    SET integration_config = COALESCE(integration_config, '{}'::jsonb)
+        || jsonb_build_object(
+            CAST(:integration_type AS text),
+            COALESCE(integration_config -> CAST(:integration_type AS text), '{}'::jsonb)
+                || jsonb_build_object('phone_numbers', CAST(:phone_numbers AS jsonb))
+        )
+    WHERE id = :dealership_id
+    RETURNING id
+    """
+)
+
 
 class DealershipPhoneMappingService:
     """Service for mapping phone numbers to dealerships"""
@@ -48,16 +80,22 @@ class DealershipPhoneMappingService:
                 logger.warning(f"Invalid phone number format: {phone_number}")
                 return None
             
+            dealership_id = dealership_phone_cache.get(normalized_phone)
+            if dealership_id:
+                return dealership_id
+            
             # Method 1: Check existing leads (most reliable)
             dealership_id = await self._find_dealership_from_leads(session, normalized_phone)
             if dealership_id:
                 logger.info(f"Found dealership {dealership_id} from existing lead for phone {normalized_phone}")
+                dealership_phone_cache.set(normalized_phone, dealership_id)
                 return dealership_id
             
             # Method 2: Check dealership integration_config for phone mappings
             dealership_id = await self._find_dealership_from_config(session, normalized_phone)
             if dealership_id:
                 logger.info(f"Found dealership {dealership_id} from integration config for phone {normalized_phone}")
+                dealership_phone_cache.set(normalized_phone, dealership_id)
                 return dealership_id
             
             # Method 3: Use default dealership (fallback)
@@ -96,47 +134,41 @@ class DealershipPhoneMappingService:
     ) -> Optional[str]:
         """Find dealership by checking integration_config for phone mappings."""
         try:
-            # Get all dealerships with integration config
-            result = await session.execute(
-                select(Dealership.id, Dealership.integration_config)
-            )
-            
-            dealerships = result.fetchall()
-            
-            for dealership in dealerships:
-                config = dealership.integration_config or {}
-                
-                # Check for WhatsApp phone mappings
-                whatsapp_config = config.get("whatsapp", {})
-                whatsapp_phones = whatsapp_config.get("phone_numbers", [])
-                
-                # Check for Vonage phone mappings
-                vonage_config = config.get("vonage", {})
-                vonage_phones = vonage_config.get("phone_numbers", [])
-                
-                # Check if this phone matches any configured numbers
-                all_configured_phones = whatsapp_phones + vonage_phones
-                
-                for configured_phone in all_configured_phones:
-                    if self._phones_match(normalized_phone, configured_phone):
-                        return str(dealership.id)
-            
-            return None
+            index = await self._get_config_phone_index(session)
+            return index.get(normalized_phone)
             
         except Exception as e:
             logger.error(f"Error finding dealership from config: {e}")
             return None
     
-    def _phones_match(self, phone1: str, phone2: str) -> bool:
-        """Check if two phone numbers match (with normalization)."""
-        try:
-            normalized1 = normalize_phone_number(phone1)
-            normalized2 = normalize_phone_number(phone2)
-            
-            return normalized1 == normalized2 if normalized1 and normalized2 else False
-            
-        except Exception:
-            return False
+    async def _get_config_phone_index(self, session: AsyncSession) -> Dict[str, str]:
+        """Map every configured WhatsApp/Vonage number to its dealership (cached)."""
+        index = _config_phone_index_cache.get("index")
+        if index is not None:
+            return index
+        
+        result = await session.execute(
+            select(Dealership.id, Dealership.integration_config)
+            .where(Dealership.integration_config.isnot(None))
+        )
+        
+        index = {}
+        for dealership_id, config in result.all():
+            for integration_type in _PHONE_INTEGRATIONS:
+                for configured_phone in (config or {}).get(integration_type, {}).get("phone_numbers", []):
+                    normalized = normalize_phone_number(configured_phone)
+                    # First match wins, as with the previous per-dealership scan
+                    if normalized:
+                        index.setdefault(normalized, str(dealership_id))
+        
+        _config_phone_index_cache.set("index", index)
+        return index
+    
+    def invalidate_phone(self, phone_number: str) -> None:
+        """Drop a phone's cached dealership, e.g. after its lead moves dealership."""
+        normalized_phone = normalize_phone_number(phone_number)
+        if normalized_phone:
+            dealership_phone_cache.pop(normalized_phone, None)
     
     async def set_dealership_phone_mapping(
         self,
@@ -158,29 +190,24 @@ class DealershipPhoneMappingService:
             True if successful, False otherwise
         """
         try:
-            # Get current dealership
+            # Merge the new list into integration_config server-side: one round trip,
+            # and no reliance on ORM change tracking of an in-place mutated JSON dict
             result = await session.execute(
-                select(Dealership)
-                .where(Dealership.id == dealership_id)
+                _SET_PHONE_NUMBERS_SQL,
+                {
+                    "dealership_id": uuid.UUID(str(dealership_id)),
+                    "integration_type": integration_type,
+                    "phone_numbers": json.dumps(phone_numbers),
+                }
             )
-            
-            dealership = result.scalar_one_or_none()
-            if not dealership:
+            if result.scalar_one_or_none() is None:
+                await session.rollback()
                 logger.error(f"Dealership {dealership_id} not found")
                 return False
             
-            # Get current config
-            config = dealership.integration_config or {}
-            
-            # Update the specific integration config
-            if integration_type not in config:
-                config[integration_type] = {}
-            
-            config[integration_type]["phone_numbers"] = phone_numbers
-            
-            # Update dealership
-            dealership.integration_config = config
             await session.commit()
+            dealership_phone_cache.clear()
+            _config_phone_index_cache.clear()
             
             logger.info(f"Updated {integration_type} phone mappings for dealership {dealership_id}: {phone_numbers}")
             return True
@@ -1,6 +1,7 @@
 """
 Resend Email Service for sending professional emails with template support
 """
+import asyncio
 import resend
 import os
 from typing import Dict, Any, Optional
@@ -64,10 +65,6 @@ class ResendEmailService:
             }
         
         try:
-            logger.info(f"🔑 API key configured: {bool(self.api_key)}")
-            logger.info(f"🔑 API key length: {len(self.api_key) if self.api_key else 0}")
-            logger.info(f"🔑 API key prefix: {self.api_key[:8] if self.api_key else 'None'}...")
-            
             # Template variables
             template_vars = {
                 "email": email,
@@ -77,8 +74,6 @@ class ResendEmailService:
                 "inviter_name": inviter_name
             }
             
-            logger.info(f"📧 Template variables: {template_vars}")
-            
             # Load and render HTML template
             html_template = self._load_template("invite_user.html")
             if not html_template:
@@ -102,15 +97,14 @@ class ResendEmailService:
             if text_content:
                 email_data["text"] = text_content
             
-            # Send email via Resend
-            logger.info(f"📨 Sending email with data: {email_data}")
-            logger.info(f"📨 From: {email_data['from']}, To: {email_data['to']}")
-            logger.info(f"📨 Subject: {email_data['subject']}")
-            
-            response = resend.Emails.send(email_data)
-            logger.info(f"📨 Resend response: {response}")
+            # Send email via Resend. The body carries the invite link (and its
+            # token), so only the envelope is logged.
+            logger.debug("📨 Sending invite email from %s to %s: %s", email_data["from"], email_data["to"], email_data["subject"])
             
-            logger.info(f"✅ Invite email sent successfully to {email} via Resend")
+            # resend's client is synchronous; run it in a worker thread so the
+            # HTTP round trip doesn't stall the event loop
+            response = await asyncio.to_thread(resend.Emails.send, email_data)
+            logger.info("✅ Invite email sent to %s via Resend (id: %s)", email, response.get("id"))
             
             return {
                 "success": True,
@@ -126,4 +120,8 @@ class ResendEmailService:
             return {
                 "success": False,
                 "error": f"Failed to send email: {str(e)}"
-            }
\ No newline at end of file
+            }
+
+
+# Global instance
+email_service = ResendEmailService()
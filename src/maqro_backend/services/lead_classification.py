@@ -16,8 +16,7 @@ Manual statuses (set by salespeople/AI) are preserved:
 
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-import pytz 
+from datetime import datetime, timedelta, timezone
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from maqro_backend.crud import get_conversations_by_lead_id
@@ -48,7 +47,7 @@ async def classify_lead(session: AsyncSession, lead: Lead) -> bool:
         return False
     
     # Get current time in UTC
-    now = datetime.now(pytz.UTC)
+    now = datetime.now(timezone.utc)
     
     # Get all conversations for this lead
     conversations = await get_conversations_by_lead_id(session=session, lead_id=str(lead.id))
@@ -72,7 +71,7 @@ def _determine_lead_status(lead: Lead, conversations: list, now: datetime) -> st
     # Ensure lead.created_at is timezone-aware
     lead_created = lead.created_at
     if lead_created.tzinfo is None:
-        lead_created = lead_created.replace(tzinfo=pytz.UTC)
+        lead_created = lead_created.replace(tzinfo=timezone.utc)
     
     lead_age = now - lead_created
     
@@ -91,7 +90,7 @@ def _determine_lead_status(lead: Lead, conversations: list, now: datetime) -> st
             # Ensure created_at is timezone-aware
             last_customer_time = conv.created_at
             if last_customer_time.tzinfo is None:
-                last_customer_time = last_customer_time.replace(tzinfo=pytz.UTC)
+                last_customer_time = last_customer_time.replace(tzinfo=timezone.utc)
             break
     
     # No customer messages yet (only agent messages)
@@ -144,7 +143,7 @@ def _is_recent_message(conversation, now: datetime, hours: int = 48) -> bool:
     """Check if a message was sent within the last X hours."""
     msg_time = conversation.created_at
     if msg_time.tzinfo is None:
-        msg_time = msg_time.replace(tzinfo=pytz.UTC)
+        msg_time = msg_time.replace(tzinfo=timezone.utc)
     
     return (now - msg_time) <= timedelta(hours=hours)
 
@@ -229,5 +228,5 @@ async def classify_all_leads(session: AsyncSession, dealership_id: str = None, b
         "total_processed": total_processed,
         "total_updated": total_updated,
         "status_distribution": status_counts,
-        "timestamp": datetime.now(pytz.UTC).isoformat()
+        "timestamp": datetime.now(timezone.utc).isoformat()
     } 
\ No newline at end of file
@@ -12,11 +12,10 @@ from typing import Dict, Any, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from datetime import datetime
-import pytz
 
 from ..crud import (
     get_lead_by_phone,
-    create_lead,
+    create_lead_with_message,
     create_conversation,
     get_all_conversation_history,
     get_user_profile_by_user_id,
@@ -699,8 +698,16 @@ Focus on: {edit_instructions}"""
             if existing_lead:
                 logger.info(f"Found existing lead: {existing_lead.name} ({existing_lead.id})")
                 lead = existing_lead
+                
+                # Add customer message to conversation history
+                await create_conversation(
+                    session=session,
+                    lead_id=str(lead.id),
+                    message=message_text,
+                    sender="customer"
+                )
             else:
-                # Create new lead
+                # Create new lead; its first message is stored in the same commit
                 logger.info(f"Creating new lead for phone number: {from_phone}")
                 lead = await self._create_lead_from_message(
                     session=session,
@@ -710,14 +717,6 @@ Focus on: {edit_instructions}"""
                     message_source=message_source
                 )
             
-            # Add customer message to conversation history
-            await create_conversation(
-                session=session,
-                lead_id=str(lead.id),
-                message=message_text,
-                sender="customer"
-            )
-            
             # Generate RAG response
             rag_response = await self._generate_rag_response(
                 session=session,
@@ -798,7 +797,7 @@ Focus on: {edit_instructions}"""
         dealership_id: str,
         message_source: str
     ) -> Any:
-        """Create a new lead from an incoming message"""
+        """Create a new lead from an incoming message, storing the message as its first conversation entry"""
         # Extract information from message if possible
         extracted_name = None
         extracted_car = "Unknown"
@@ -830,11 +829,13 @@ Focus on: {edit_instructions}"""
 
         # Don't assign a user initially - leads from SMS can be unassigned
         # They will be assigned later by dealership staff
-        lead = await create_lead(
+        lead = await create_lead_with_message(
             session=session,
             lead_in=lead_data,
             user_id=None,  # No assigned user for SMS leads initially
-            dealership_id=dealership_id
+            dealership_id=dealership_id,
+            message=message_text,
+            sender="customer"
         )
         
         logger.info(f"Created new lead: {lead.id}")
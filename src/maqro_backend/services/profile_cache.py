@@ -0,0 +1,34 @@
+"""
+Process-local cache of user profiles for permission checks
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from ..utils.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class CachedUserProfile:
+    """
+    Read-only copy of a user_profiles row.
+
+    Cached instead of the ORM object: a UserProfile stays attached to the
+    session that loaded it, so a rollback there would expire it for every
+    later request, and one instance would be shared across sessions.
+    """
+    id: uuid.UUID
+    user_id: uuid.UUID
+    dealership_id: Optional[uuid.UUID]
+    full_name: Optional[str]
+    phone: Optional[str]
+    role: Optional[str]
+    timezone: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+# Short-lived user_id -> CachedUserProfile cache for permission checks on hot endpoints.
+# Entries are popped whenever a profile's role or dealership changes.
+user_profile_cache = TTLCache(maxsize=10_000, ttl=30)
@@ -2,12 +2,13 @@
 Roles and permissions service for managing user access control
 """
 import logging
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from ..db.models import Role, UserRole, UserProfile, Dealership
+from .profile_cache import user_profile_cache
 from ..schemas.roles import (
     RoleResponse,
     UserRoleResponse,
@@ -28,6 +29,16 @@ class RolesService:
         "salesperson": 40
     }
 
+    @staticmethod
+    def check_level_from_name(current_role: Optional[str], required_role: str) -> bool:
+        """Check a role name against a required role level without touching the DB"""
+        if not current_role:
+            return False
+        return (
+            RolesService.ROLE_HIERARCHY.get(current_role, 0)
+            >= RolesService.ROLE_HIERARCHY.get(required_role, 100)
+        )
+
     @staticmethod
     async def get_all_roles(db: AsyncSession) -> List[Role]:
         """Get all available roles"""
@@ -64,8 +75,16 @@ class RolesService:
         dealership_id: str
     ) -> Optional[str]:
         """Get a user's role name at a specific dealership"""
-        user_role = await RolesService.get_user_role(db, user_id, dealership_id)
-        return user_role.role.name if user_role else None
+        # Only the name is needed, so skip building UserRole/Role entities
+        result = await db.execute(
+            select(Role.name)
+            .join(UserRole, UserRole.role_id == Role.id)
+            .where(
+                UserRole.user_id == user_id,
+                UserRole.dealership_id == dealership_id
+            )
+        )
+        return result.scalar_one_or_none()
 
     @staticmethod
     async def assign_user_role(
@@ -99,12 +118,20 @@ class RolesService:
             db.add(user_role)
 
         await db.commit()
-        await db.refresh(user_role)
-        
-        # Load the role relationship
-        await db.refresh(user_role, ["role"])
+
+        # Drop any cached profile so permission checks see the new role
+        user_profile_cache.pop(str(user_id), None)
         
-        return user_role
+        # Reload the committed row with its role eagerly joined in one query,
+        # so callers can read user_role.role without a lazy load. Sessions don't
+        # expire on commit, so populate_existing is needed to replace a stale role.
+        result = await db.execute(
+            select(UserRole).where(
+                UserRole.user_id == user_id,
+                UserRole.dealership_id == dealership_id
+            ).options(joinedload(UserRole.role)).execution_options(populate_existing=True)
+        )
+        return result.scalar_one()
 
     @staticmethod
     async def remove_user_role(
@@ -126,9 +153,20 @@ class RolesService:
         db: AsyncSession,
         dealership_id: str
     ) -> List[UserWithRoleResponse]:
-        """Get all users in a dealership with their roles"""
+        """Get all users in a dealership with their roles in one joined query"""
+        # Project only the response columns: plain rows skip building three
+        # ORM entities (and identity-map entries) per user
         result = await db.execute(
-            select(UserProfile, UserRole, Role).join(
+            select(
+                UserProfile.user_id,
+                UserProfile.full_name,
+                UserProfile.phone,
+                Role.id.label("role_id"),
+                Role.name.label("role_name"),
+                Role.description.label("role_description"),
+                Role.created_at.label("role_created_at"),
+                UserRole.created_at.label("assigned_at")
+            ).join(
                 UserRole, UserProfile.user_id == UserRole.user_id
             ).join(
                 Role, UserRole.role_id == Role.id
@@ -138,23 +176,22 @@ class RolesService:
             )
         )
         
-        users_with_roles = []
-        for user_profile, user_role, role in result:
-            users_with_roles.append(UserWithRoleResponse(
-                user_id=str(user_profile.user_id),
-                dealership_id=str(user_profile.dealership_id),
-                full_name=user_profile.full_name,
-                phone=user_profile.phone,
+        return [
+            UserWithRoleResponse(
+                user_id=str(row.user_id),
+                dealership_id=str(dealership_id),
+                full_name=row.full_name,
+                phone=row.phone,
                 role=RoleResponse(
-                    id=str(role.id),
-                    name=role.name,
-                    description=role.description,
-                    created_at=role.created_at
+                    id=str(row.role_id),
+                    name=row.role_name,
+                    description=row.role_description,
+                    created_at=row.role_created_at
                 ),
-                created_at=user_role.created_at
-            ))
-        
-        return users_with_roles
+                created_at=row.assigned_at
+            )
+            for row in result
+        ]
 
     @staticmethod
     async def user_has_role_level(
@@ -165,14 +202,30 @@ class RolesService:
     ) -> bool:
         """Check if user has at least the required role level"""
         user_role_name = await RolesService.get_user_role_name(db, user_id, dealership_id)
-        
-        if not user_role_name:
-            return False
-        
-        user_level = RolesService.ROLE_HIERARCHY.get(user_role_name, 0)
-        required_level = RolesService.ROLE_HIERARCHY.get(required_role, 100)
-        
-        return user_level >= required_level
+        return RolesService.check_level_from_name(user_role_name, required_role)
+
+    @staticmethod
+    async def get_user_role_with_permissions(
+        db: AsyncSession,
+        user_id: str,
+        dealership_id: str
+    ) -> Tuple[Optional[UserRole], bool, bool]:
+        """
+        Get a user's role plus (can_manage_settings, can_assign_roles) from one query
+
+        Equivalent to get_user_role + user_can_manage_settings +
+        user_can_assign_roles, which would otherwise read the same row three times.
+        """
+        user_role = await RolesService.get_user_role(db, user_id, dealership_id)
+        if not user_role:
+            return None, False, False
+
+        role_name = user_role.role.name
+        return (
+            user_role,
+            RolesService.check_level_from_name(role_name, "manager"),
+            RolesService.check_level_from_name(role_name, "owner"),
+        )
 
     @staticmethod
     async def user_can_manage_settings(
@@ -205,8 +258,18 @@ class RolesService:
     ) -> bool:
         """Check if a user can manage another user (must have higher role level)"""
         
-        manager_role = await RolesService.get_user_role_name(db, manager_user_id, dealership_id)
-        target_role = await RolesService.get_user_role_name(db, target_user_id, dealership_id)
+        # Both users' role names in one query
+        result = await db.execute(
+            select(UserRole.user_id, Role.name)
+            .join(Role, UserRole.role_id == Role.id)
+            .where(
+                UserRole.user_id.in_([manager_user_id, target_user_id]),
+                UserRole.dealership_id == dealership_id
+            )
+        )
+        role_names = {str(row_user_id): name for row_user_id, name in result.all()}
+        manager_role = role_names.get(str(manager_user_id))
+        target_role = role_names.get(str(target_user_id))
         
         if not manager_role or not target_role:
             return False
@@ -4,8 +4,7 @@ Settings service for managing hierarchical settings (user → dealership → def
 import logging
 from typing import Any, Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text
-from sqlalchemy.orm import joinedload
+from sqlalchemy import Row, String, and_, cast, select, text
 
 from ..db.models import (
     SettingDefinition, 
@@ -19,9 +18,27 @@ from ..schemas.settings import (
     UserSettingResponse,
     EffectiveSettingResponse
 )
+from ..utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# (user_id, key) -> resolved value and (user_id, key, "source") -> EffectiveSettingResponse.
+# User writes pop their keys; dealership writes clear everything since any
+# member may inherit the changed value. The TTL bounds staleness across workers.
+user_setting_cache = TTLCache(maxsize=10_000, ttl=60)
+_MISSING = object()
+
+
+def _json_type(value: Any) -> str:
+    """Name of a setting value's JSON type, in setting_definitions' data_type vocabulary."""
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return "json"
+
 
 class SettingsService:
     """Service for managing settings across the hierarchy"""
@@ -46,6 +63,10 @@ class SettingsService:
         Get effective setting value for a user (user → dealership → default)
         Uses the database function for optimal performance
         """
+        cached = user_setting_cache.get((str(user_id), key), _MISSING)
+        if cached is not _MISSING:
+            return cached
+
         try:
             result = await db.execute(
                 text("SELECT get_setting(:user_id, :key)"),
@@ -56,8 +77,9 @@ class SettingsService:
             # If the function returns null, try to get the default
             if value is None:
                 definition = await SettingsService.get_setting_definition(db, key)
-                return definition.default_value if definition else None
+                value = definition.default_value if definition else None
             
+            user_setting_cache.set((str(user_id), key), value)
             return value
             
         except Exception as e:
@@ -66,6 +88,61 @@ class SettingsService:
             definition = await SettingsService.get_setting_definition(db, key)
             return definition.default_value if definition else None
 
+    @staticmethod
+    async def get_user_settings_bulk(db: AsyncSession, user_id: str, keys: List[str]) -> Dict[str, Any]:
+        """
+        Resolve several settings for a user (user → dealership → default)
+
+        Cache misses are resolved together in one query that LEFT JOINs the
+        user and dealership overrides onto the definitions. Unknown keys are
+        left out of the result.
+        """
+        values: Dict[str, Any] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            cached = user_setting_cache.get((str(user_id), key), _MISSING)
+            if cached is _MISSING:
+                missing.append(key)
+            else:
+                values[key] = cached
+
+        if missing:
+            user_dealership = (
+                select(UserProfile.dealership_id)
+                .where(UserProfile.user_id == user_id)
+                .limit(1)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                select(
+                    SettingDefinition.setting_key,
+                    UserSetting.setting_value,
+                    DealershipSetting.setting_value,
+                    SettingDefinition.default_value
+                ).outerjoin(
+                    UserSetting,
+                    and_(
+                        UserSetting.setting_key == SettingDefinition.setting_key,
+                        UserSetting.user_id == user_id
+                    )
+                ).outerjoin(
+                    DealershipSetting,
+                    and_(
+                        DealershipSetting.setting_key == SettingDefinition.setting_key,
+                        DealershipSetting.dealership_id == user_dealership
+                    )
+                ).where(SettingDefinition.setting_key.in_(missing))
+            )
+            for key, user_value, dealership_value, default_value in result:
+                value = next(
+                    (v for v in (user_value, dealership_value, default_value) if v is not None),
+                    None
+                )
+                user_setting_cache.set((str(user_id), key), value)
+                values[key] = value
+
+        return values
+
     @staticmethod
     async def get_user_setting_with_source(
         db: AsyncSession, 
@@ -73,59 +150,74 @@ class SettingsService:
         key: str
     ) -> EffectiveSettingResponse:
         """Get setting value with information about where it came from"""
-        
-        # Check user-level setting first
-        user_result = await db.execute(
-            select(UserSetting).where(
-                UserSetting.user_id == user_id,
-                UserSetting.setting_key == key
-            )
-        )
-        user_setting = user_result.scalar_one_or_none()
-        
-        if user_setting:
-            definition = await SettingsService.get_setting_definition(db, key)
-            return EffectiveSettingResponse(
-                key=key,
-                value=user_setting.setting_value,
-                source="user",
-                data_type=definition.data_type if definition else "unknown",
-                description=definition.description if definition else None
-            )
+        cache_key = (str(user_id), key, "source")
+        cached = user_setting_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-        # Check dealership-level setting
-        dealership_result = await db.execute(
-            select(DealershipSetting, UserProfile.dealership_id).join(
-                UserProfile, UserProfile.dealership_id == DealershipSetting.dealership_id
-            ).where(
-                UserProfile.user_id == user_id,
-                DealershipSetting.setting_key == key
-            )
+        effective = await SettingsService._resolve_user_setting_with_source(db, user_id, key)
+        user_setting_cache.set(cache_key, effective)
+        return effective
+
+    @staticmethod
+    async def _resolve_user_setting_with_source(
+        db: AsyncSession, 
+        user_id: str, 
+        key: str
+    ) -> EffectiveSettingResponse:
+        """
+        Resolve user → dealership → default for get_user_setting_with_source
+
+        One query: the definition row with the user's and their dealership's
+        overrides LEFT JOINed on; the override key columns tell which exist.
+        """
+        user_dealership = (
+            select(UserProfile.dealership_id)
+            .where(UserProfile.user_id == user_id)
+            .limit(1)
+            .scalar_subquery()
         )
-        dealership_setting = dealership_result.first()
-        
-        if dealership_setting:
-            definition = await SettingsService.get_setting_definition(db, key)
-            return EffectiveSettingResponse(
-                key=key,
-                value=dealership_setting[0].setting_value,
-                source="dealership",
-                data_type=definition.data_type if definition else "unknown",
-                description=definition.description if definition else None
-            )
+        result = await db.execute(
+            select(
+                SettingDefinition.default_value,
+                SettingDefinition.description,
+                UserSetting.setting_key,
+                UserSetting.setting_value,
+                DealershipSetting.setting_key,
+                DealershipSetting.setting_value
+            ).outerjoin(
+                UserSetting,
+                and_(
+                    UserSetting.setting_key == SettingDefinition.setting_key,
+                    UserSetting.user_id == user_id
+                )
+            ).outerjoin(
+                DealershipSetting,
+                and_(
+                    DealershipSetting.setting_key == SettingDefinition.setting_key,
+                    DealershipSetting.dealership_id == user_dealership
+                )
+            ).where(SettingDefinition.setting_key == key)
+        )
+        row = result.first()
+        if row is None:
+            raise ValueError(f"Setting definition not found for key: {key}")
 
-        # Use default value
-        definition = await SettingsService.get_setting_definition(db, key)
-        if definition:
-            return EffectiveSettingResponse(
-                key=key,
-                value=definition.default_value,
-                source="default",
-                data_type=definition.data_type,
-                description=definition.description
-            )
-        
-        raise ValueError(f"Setting definition not found for key: {key}")
+        default_value, description, user_key, user_value, dealership_key, dealership_value = row
+        if user_key is not None:
+            value, source = user_value, "user"
+        elif dealership_key is not None:
+            value, source = dealership_value, "dealership"
+        else:
+            value, source = default_value, "default"
+
+        return EffectiveSettingResponse.model_construct(
+            key=key,
+            value=value,
+            source=source,
+            data_type=_json_type(value),
+            description=description
+        )
 
     @staticmethod
     async def update_user_setting(
@@ -172,6 +264,7 @@ class SettingsService:
 
         await db.commit()
         await db.refresh(setting)
+        SettingsService._invalidate_user_setting(user_id, key)
         return setting
 
     @staticmethod
@@ -219,33 +312,55 @@ class SettingsService:
 
         await db.commit()
         await db.refresh(setting)
+        # Every member without an override inherits this value
+        user_setting_cache.clear()
         return setting
 
     @staticmethod
     async def get_dealership_settings(
         db: AsyncSession, 
         dealership_id: str
-    ) -> List[DealershipSetting]:
-        """Get all settings for a dealership"""
+    ) -> List[Row]:
+        """
+        Get all settings for a dealership
+
+        Returns lightweight rows (dealership_id, setting_key, setting_value,
+        created_at, updated_at, updated_by) rather than ORM objects; the UUID
+        columns are cast to text in SQL so they arrive as ready-to-encode strings.
+        """
         result = await db.execute(
-            select(DealershipSetting).where(
-                DealershipSetting.dealership_id == dealership_id
-            ).options(joinedload(DealershipSetting.definition))
+            select(
+                cast(DealershipSetting.dealership_id, String).label("dealership_id"),
+                DealershipSetting.setting_key,
+                DealershipSetting.setting_value,
+                DealershipSetting.created_at,
+                DealershipSetting.updated_at,
+                cast(DealershipSetting.updated_by, String).label("updated_by")
+            ).where(DealershipSetting.dealership_id == dealership_id)
         )
-        return result.scalars().all()
+        return result.all()
 
     @staticmethod
     async def get_user_settings(
         db: AsyncSession, 
         user_id: str
-    ) -> List[UserSetting]:
-        """Get all personal settings for a user"""
+    ) -> List[Row]:
+        """
+        Get all personal settings for a user
+
+        Returns lightweight rows like get_dealership_settings, keyed by user_id.
+        """
         result = await db.execute(
-            select(UserSetting).where(
-                UserSetting.user_id == user_id
-            ).options(joinedload(UserSetting.definition))
+            select(
+                cast(UserSetting.user_id, String).label("user_id"),
+                UserSetting.setting_key,
+                UserSetting.setting_value,
+                UserSetting.created_at,
+                UserSetting.updated_at,
+                cast(UserSetting.updated_by, String).label("updated_by")
+            ).where(UserSetting.user_id == user_id)
         )
-        return result.scalars().all()
+        return result.all()
 
     @staticmethod
     async def delete_user_setting(db: AsyncSession, user_id: str, key: str) -> bool:
@@ -261,9 +376,16 @@ class SettingsService:
         if setting:
             await db.delete(setting)
             await db.commit()
+            SettingsService._invalidate_user_setting(user_id, key)
             return True
         return False
 
+    @staticmethod
+    def _invalidate_user_setting(user_id: str, key: str) -> None:
+        """Drop cached resolutions of one setting for one user"""
+        user_setting_cache.pop((str(user_id), key), None)
+        user_setting_cache.pop((str(user_id), key, "source"), None)
+
     @staticmethod
     async def _validate_setting_value(definition: SettingDefinition, value: Any) -> None:
         """Validate a setting value against its definition"""
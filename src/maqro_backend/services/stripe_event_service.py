@@ -0,0 +1,457 @@
+"""
+Stripe webhook event storage and processing
+
+The webhook route stores each verified event with store_event (committed
+before Stripe gets its 2xx) and queues process_stored_event. Events that
+failed or were interrupted stay unprocessed and are retried by
+retry_pending_events_periodically, so an acknowledged event is never lost.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import stripe
+from sqlalchemy import Interval, Select, Text, bindparam, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.models import Dealership, SubscriptionPlan, DealershipSubscription, SubscriptionEvent, StripeWebhookEvent
+from ..db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+
+# Failed events are retried until they have been attempted this many times
+MAX_EVENT_ATTEMPTS = 5
+
+
+# Statements are built once at import so SQLAlchemy's compiled cache is hit
+# on every event; values are supplied as bind parameters at execute time
+
+# Stored event bookkeeping. The row is locked while it is applied, so a retry
+# sweep in another worker skips it instead of applying it twice
+_STORE_EVENT = (
+    pg_insert(StripeWebhookEvent)
+    .values(
+        stripe_event_id=bindparam("event_id"),
+        event_type=bindparam("event_type"),
+        payload=bindparam("payload", type_=StripeWebhookEvent.payload.type),
+    )
+    .on_conflict_do_nothing(index_elements=[StripeWebhookEvent.stripe_event_id])
+    .returning(StripeWebhookEvent.stripe_event_id)
+)
+
+_EVENT_IS_PENDING = select(StripeWebhookEvent.processed_at.is_(None)).where(
+    StripeWebhookEvent.stripe_event_id == bindparam("event_id")
+)
+
+_LOCK_PENDING_EVENT = (
+    select(StripeWebhookEvent.event_type, StripeWebhookEvent.payload)
+    .where(
+        StripeWebhookEvent.stripe_event_id == bindparam("event_id"),
+        StripeWebhookEvent.processed_at.is_(None),
+    )
+    .with_for_update(skip_locked=True)
+)
+
+_MARK_EVENT_PROCESSED = (
+    update(StripeWebhookEvent)
+    .where(StripeWebhookEvent.stripe_event_id == bindparam("event_id"))
+    .values(processed_at=func.now(), attempts=StripeWebhookEvent.attempts + 1, last_error=None)
+)
+
+_RECORD_EVENT_FAILURE = (
+    update(StripeWebhookEvent)
+    .where(StripeWebhookEvent.stripe_event_id == bindparam("event_id"))
+    .values(attempts=StripeWebhookEvent.attempts + 1, last_error=bindparam("error", type_=Text))
+)
+
+_SELECT_EVENTS_TO_RETRY = (
+    select(StripeWebhookEvent.stripe_event_id)
+    .where(
+        StripeWebhookEvent.processed_at.is_(None),
+        StripeWebhookEvent.received_at < func.now() - bindparam("min_age", type_=Interval),
+        StripeWebhookEvent.attempts < MAX_EVENT_ATTEMPTS,
+    )
+    .order_by(StripeWebhookEvent.received_at)
+    .limit(100)
+)
+
+
+_SELECT_PLAN_ID = select(SubscriptionPlan.id).where(
+    SubscriptionPlan.stripe_product_id == bindparam("product_id")
+)
+
+_EVENT_COLUMNS = ["dealership_subscription_id", "event_type", "stripe_event_id", "event_data"]
+
+
+def _event_values(subscription_id) -> Select:
+    """SELECT feeding an event insert: the subscription id plus the event bind parameters."""
+    return select(
+        subscription_id,
+        bindparam("event_type", type_=Text),
+        bindparam("stripe_event_id", type_=Text),
+        bindparam("event_data", type_=SubscriptionEvent.event_data.type),
+    )
+
+
+def _insert_event(values: Select):
+    # Against the Table, not the mapped class: Session.execute treats an ORM
+    # insert plus a parameter dict as a bulk insert, which breaks from_select
+    return (
+        pg_insert(SubscriptionEvent.__table__)
+        .from_select(_EVENT_COLUMNS, values)
+        .on_conflict_do_nothing(index_elements=[SubscriptionEvent.stripe_event_id])
+    )
+
+
+# Create the subscription, point the dealership at it and log the event
+# in one statement (one round trip, one transaction)
+_new_subscription = (
+    pg_insert(DealershipSubscription)
+    .values(
+        dealership_id=bindparam("dealership_id"),
+        subscription_plan_id=bindparam("subscription_plan_id"),
+        stripe_subscription_id=bindparam("stripe_subscription_id"),
+        stripe_customer_id=bindparam("stripe_customer_id"),
+        status=bindparam("status"),
+        current_period_start=bindparam("current_period_start"),
+        current_period_end=bindparam("current_period_end"),
+    )
+    .on_conflict_do_nothing(index_elements=[DealershipSubscription.stripe_subscription_id])
+    .returning(DealershipSubscription.id)
+    .cte("sub")
+)
+_CREATE_CHECKOUT_SUBSCRIPTION = (
+    select(_new_subscription.c.id)
+    .add_cte(
+        update(Dealership)
+        # Only when this delivery created the row: on conflict `sub` is empty and
+        # the dealership must keep its current subscription, not be set to NULL
+        .where(Dealership.id == bindparam("dealership_id"), exists(select(_new_subscription.c.id)))
+        .values(current_subscription_id=select(_new_subscription.c.id).scalar_subquery())
+        .cte("dealership"),
+        _insert_event(_event_values(_new_subscription.c.id)).cte("event"),
+    )
+)
+
+_UPDATE_SUBSCRIPTION_CREATED = (
+    update(DealershipSubscription)
+    .where(DealershipSubscription.stripe_subscription_id == bindparam("stripe_id"))
+    .values(
+        stripe_customer_id=bindparam("customer_id"),
+        status=bindparam("status"),
+        current_period_start=bindparam("period_start"),
+        current_period_end=bindparam("period_end"),
+    )
+)
+
+_UPDATE_SUBSCRIPTION_UPDATED = (
+    update(DealershipSubscription)
+    .where(DealershipSubscription.stripe_subscription_id == bindparam("stripe_id"))
+    .values(
+        status=bindparam("status"),
+        current_period_start=bindparam("period_start"),
+        current_period_end=bindparam("period_end"),
+        canceled_at=bindparam("canceled_at"),
+    )
+)
+
+_UPDATE_SUBSCRIPTION_DELETED = (
+    update(DealershipSubscription)
+    .where(DealershipSubscription.stripe_subscription_id == bindparam("stripe_id"))
+    .values(status="canceled", canceled_at=bindparam("canceled_at"))
+)
+
+# Log an event against the subscription matching :stripe_id; inserts nothing
+# when the subscription is unknown
+_INSERT_EVENT_BY_STRIPE_ID = _insert_event(
+    _event_values(DealershipSubscription.id).where(
+        DealershipSubscription.stripe_subscription_id == bindparam("stripe_id")
+    )
+)
+
+# Mark the subscription past due and log the event from UPDATE ... RETURNING
+_past_due = (
+    update(DealershipSubscription)
+    .where(DealershipSubscription.stripe_subscription_id == bindparam("stripe_id"))
+    .values(status="past_due")
+    .returning(DealershipSubscription.id)
+    .cte("sub")
+)
+_MARK_PAST_DUE_AND_LOG = _insert_event(_event_values(_past_due.c.id))
+
+
+def _ts_to_dt(value: Any) -> datetime | None:
+    """Convert a unix timestamp (seconds) to datetime, or return None when missing."""
+    try:
+        if value is None:
+            return None
+        return datetime.fromtimestamp(int(value))
+    except Exception:
+        return None
+
+
+def _stripe_id(value: Any) -> str | None:
+    """Id of a Stripe reference that may be either an id string or an expanded object."""
+    if isinstance(value, str) or value is None:
+        return value
+    return value.get('id')
+
+
+async def _subscription_period(subscription: Any) -> tuple[datetime | None, datetime | None]:
+    """
+    Billing period of a checkout session's subscription.
+
+    Webhook payloads carry the subscription as an id, so it is fetched from
+    Stripe; an expanded object is read directly. Returns (None, None) when
+    unavailable, leaving customer.subscription.* events to fill it in.
+    """
+    if not subscription:
+        return None, None
+    try:
+        if isinstance(subscription, str):
+            subscription = await asyncio.to_thread(stripe.Subscription.retrieve, subscription)
+        return (
+            _ts_to_dt(subscription.get('current_period_start')),
+            _ts_to_dt(subscription.get('current_period_end')),
+        )
+    except Exception as e:
+        logger.warning(f"Could not load billing period for subscription: {e}")
+        return None, None
+
+
+# Handlers only execute statements; process_stored_event commits their writes
+# together with the event's processed mark
+
+
+async def handle_checkout_session_completed(session: Dict[str, Any], db: AsyncSession, event_id: str):
+    """Handle successful checkout session"""
+    logger.info(f"Processing checkout session completed: {session['id']}")
+    logger.info(f"Session metadata: {session.get('metadata', {})}")
+    
+    metadata = session.get('metadata', {})
+    dealership_id = metadata.get('dealership_id')
+    product_id = metadata.get('product_id')
+    
+    logger.info(f"Dealership ID: {dealership_id}, Product ID: {product_id}")
+    
+    if not dealership_id or not product_id:
+        logger.error("Missing dealership_id or product_id in session metadata")
+        logger.error(f"Available metadata keys: {list(metadata.keys())}")
+        return
+    
+    # Get the subscription plan; a DB error propagates so the event is retried
+    plan = await db.execute(
+        _SELECT_PLAN_ID,
+        {"product_id": product_id}
+    )
+    plan = plan.fetchone()
+    
+    if not plan:
+        logger.error(f"Subscription plan not found for product: {product_id}")
+        return
+    
+    logger.info(f"Found subscription plan: {plan}")
+    
+    # Create subscription record
+    period_start, period_end = await _subscription_period(session.get('subscription'))
+    subscription_data = {
+        "dealership_id": dealership_id,
+        "subscription_plan_id": plan.id,
+        "stripe_subscription_id": _stripe_id(session.get('subscription')),
+        "stripe_customer_id": session.get('customer'),
+        "status": "active",
+        "current_period_start": period_start,
+        "current_period_end": period_end,
+    }
+    
+    result = await db.execute(
+        _CREATE_CHECKOUT_SUBSCRIPTION,
+        {
+            **subscription_data,
+            "event_type": "created",
+            "stripe_event_id": event_id,
+            "event_data": {
+                "tier": metadata.get('tier'),
+                "quantity": metadata.get('quantity'),
+                "price_per_unit": metadata.get('price_per_unit'),
+                "setup_fee": metadata.get('setup_fee'),
+            }
+        }
+    )
+    subscription_id = result.scalar_one_or_none()
+    
+    if subscription_id is None:
+        logger.info(f"Subscription {subscription_data['stripe_subscription_id']} already recorded, skipping")
+        return
+    logger.info(f"Subscription created successfully: {subscription_id}")
+
+
+async def handle_subscription_created(subscription: Dict[str, Any], db: AsyncSession, event_id: str):
+    """Handle subscription created event"""
+    logger.info(f"Processing subscription created: {subscription['id']}")
+    
+    await db.execute(
+        _UPDATE_SUBSCRIPTION_CREATED,
+        {
+            "stripe_id": subscription.get('id'),
+            "customer_id": subscription.get('customer'),
+            "status": subscription.get('status'),
+            "period_start": _ts_to_dt(subscription.get('current_period_start')),
+            "period_end": _ts_to_dt(subscription.get('current_period_end')),
+        }
+    )
+
+
+async def handle_subscription_updated(subscription: Dict[str, Any], db: AsyncSession, event_id: str):
+    """Handle subscription updated event"""
+    logger.info(f"Processing subscription updated: {subscription['id']}")
+    
+    await db.execute(
+        _UPDATE_SUBSCRIPTION_UPDATED,
+        {
+            "stripe_id": subscription.get('id'),
+            "status": subscription.get('status'),
+            "period_start": _ts_to_dt(subscription.get('current_period_start')),
+            "period_end": _ts_to_dt(subscription.get('current_period_end')),
+            "canceled_at": _ts_to_dt(subscription.get('canceled_at')),
+        }
+    )
+
+
+async def handle_subscription_deleted(subscription: Dict[str, Any], db: AsyncSession, event_id: str):
+    """Handle subscription deleted event"""
+    logger.info(f"Processing subscription deleted: {subscription['id']}")
+    
+    await db.execute(
+        _UPDATE_SUBSCRIPTION_DELETED,
+        {
+            "stripe_id": subscription['id'],
+            "canceled_at": datetime.now(),
+        }
+    )
+
+
+async def handle_payment_succeeded(invoice: Dict[str, Any], db: AsyncSession, event_id: str):
+    """Handle successful payment"""
+    logger.info(f"Processing payment succeeded: {invoice['id']}")
+    
+    if not invoice.get('subscription'):
+        return
+    
+    # Log the event
+    await db.execute(
+        _INSERT_EVENT_BY_STRIPE_ID,
+        {
+            "stripe_id": invoice['subscription'],
+            "event_type": "payment_succeeded",
+            "stripe_event_id": event_id,
+            "event_data": {
+                "amount_paid": invoice['amount_paid'],
+                "currency": invoice['currency'],
+            }
+        }
+    )
+
+
+async def handle_payment_failed(invoice: Dict[str, Any], db: AsyncSession, event_id: str):
+    """Handle failed payment"""
+    logger.info(f"Processing payment failed: {invoice['id']}")
+    
+    if not invoice.get('subscription'):
+        return
+    
+    # Update subscription status and log the event
+    await db.execute(
+        _MARK_PAST_DUE_AND_LOG,
+        {
+            "stripe_id": invoice['subscription'],
+            "event_type": "payment_failed",
+            "stripe_event_id": event_id,
+            "event_data": {
+                "amount_due": invoice['amount_due'],
+                "currency": invoice['currency'],
+            }
+        }
+    )
+
+
+# Stripe event type -> handler, dispatched by process_stored_event
+EVENT_HANDLERS = {
+    'checkout.session.completed': handle_checkout_session_completed,
+    'customer.subscription.created': handle_subscription_created,
+    'customer.subscription.updated': handle_subscription_updated,
+    'customer.subscription.deleted': handle_subscription_deleted,
+    'invoice.payment_succeeded': handle_payment_succeeded,
+    'invoice.payment_failed': handle_payment_failed,
+}
+
+
+async def store_event(db: AsyncSession, event: Dict[str, Any]) -> bool:
+    """
+    Persist a verified event and commit it.
+
+    Returns False when the event was already applied (a redelivery), True
+    when it still needs processing.
+    """
+    stored = await db.execute(
+        _STORE_EVENT,
+        {"event_id": event['id'], "event_type": event['type'], "payload": event}
+    )
+    if stored.scalar_one_or_none() is None:
+        # Known event: only needs processing if it never completed
+        pending = (await db.execute(_EVENT_IS_PENDING, {"event_id": event['id']})).scalar()
+        return bool(pending)
+    await db.commit()
+    return True
+
+
+async def process_stored_event(event_id: str) -> None:
+    """Apply a stored event and mark it processed, in one transaction on its own session."""
+    async with AsyncSessionLocal() as db:
+        try:
+            row = (await db.execute(_LOCK_PENDING_EVENT, {"event_id": event_id})).first()
+            if row is None:
+                # Already processed, or being processed by another worker
+                return
+            handler = EVENT_HANDLERS.get(row.event_type)
+            if handler is not None:
+                await handler(row.payload['data']['object'], db, event_id)
+            await db.execute(_MARK_EVENT_PROCESSED, {"event_id": event_id})
+            await db.commit()
+        except Exception as e:
+            logger.exception(f"Failed to process Stripe event {event_id}; it will be retried")
+            await db.rollback()
+            try:
+                await db.execute(_RECORD_EVENT_FAILURE, {"event_id": event_id, "error": str(e)})
+                await db.commit()
+            except Exception:
+                logger.exception(f"Could not record failure for Stripe event {event_id}")
+
+
+async def retry_pending_events_periodically(interval_seconds: int = 300, min_age_seconds: int = 300):
+    """
+    Re-run stored events that were never applied, every interval_seconds.
+
+    Only events older than min_age_seconds are picked up, so events the
+    webhook just queued are left to their own background task. Runs until
+    cancelled.
+    """
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    _SELECT_EVENTS_TO_RETRY, {"min_age": timedelta(seconds=min_age_seconds)}
+                )
+                event_ids = result.scalars().all()
+            for event_id in event_ids:
+                await process_stored_event(event_id)
+            if event_ids:
+                logger.info(f"Retried {len(event_ids)} pending Stripe events")
+        except Exception as e:
+            logger.error(f"Error retrying pending Stripe events: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -22,6 +22,23 @@ class TelnyxMessagingService:
         self.phone_number = settings.telnyx_phone_number
         self.webhook_secret = settings.telnyx_webhook_secret
         self.base_url = "https://api.telnyx.com/v2"
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client, so sends reuse pooled TCP/TLS connections"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=30.0
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the shared client (called on app shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     def _validate_credentials(self) -> bool:
         """Validate that all required Telnyx credentials are available"""
@@ -57,39 +74,37 @@ class TelnyxMessagingService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/messages",
-                    json=payload,
-                    headers=headers,
-                    timeout=30.0
-                )
-                
-                if response.status_code not in [200, 201]:
-                    logger.error(f"Telnyx API error: {response.status_code} - {response.text}")
-                    return {
-                        "success": False, 
-                        "error": f"API error: {response.status_code}",
-                        "details": response.text
-                    }
-                
-                result = response.json()
-                logger.info(f"Telnyx SMS response: {result}")
+            response = await self.client.post(
+                f"{self.base_url}/messages",
+                json=payload,
+                headers=headers
+            )
+            
+            if response.status_code not in [200, 201]:
+                logger.error(f"Telnyx API error: {response.status_code} - {response.text}")
+                return {
+                    "success": False, 
+                    "error": f"API error: {response.status_code}",
+                    "details": response.text
+                }
+            
+            result = response.json()
+            logger.info(f"Telnyx SMS response: {result}")
+            
+            # Check if message was sent successfully
+            if result.get("data"):
+                message_data = result["data"]
+                return {
+                    "success": True,
+                    "message_id": message_data.get("id"),
+                    "to": to,
+                    "from": self.phone_number,
+                    "status": "sent"
+                }
+            else:
+                logger.error(f"Invalid response from Telnyx API: {result}")
+                return {"success": False, "error": "Invalid response from Telnyx"}
                 
-                # Check if message was sent successfully
-                if result.get("data"):
-                    message_data = result["data"]
-                    return {
-                        "success": True,
-                        "message_id": message_data.get("id"),
-                        "to": to,
-                        "from": self.phone_number,
-                        "status": "sent"
-                    }
-                else:
-                    logger.error(f"Invalid response from Telnyx API: {result}")
-                    return {"success": False, "error": "Invalid response from Telnyx"}
-                    
         except httpx.TimeoutException:
             logger.error("Telnyx API request timeout")
             return {"success": False, "error": "Request timeout"}
@@ -102,7 +117,7 @@ class TelnyxMessagingService:
     
     
     
-    def verify_webhook_signature(self, payload: str, signature: str, timestamp: str = "") -> bool:
+    def verify_webhook_signature(self, payload: bytes, signature: str, timestamp: str = "") -> bool:
         """
         Verify Telnyx webhook signature for security
 
@@ -110,7 +125,8 @@ class TelnyxMessagingService:
         For now, signature verification is disabled pending proper ED25519 implementation.
 
         Args:
-            payload: Raw request body as string
+            payload: Raw request body bytes, exactly as received (the signature
+                covers the bytes, so the body is never decoded for verification)
             signature: Telnyx-Signature-Ed25519 header value
             timestamp: Telnyx-Timestamp header value
 
@@ -190,10 +206,8 @@ class TelnyxMessagingService:
             logger.info(f"Parsed message: from={parsed_data['from_phone']}, text={parsed_data.get('message_text')}")
             return parsed_data
 
-        except Exception as e:
-            logger.error(f"Error parsing Telnyx webhook message: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+        except Exception:
+            logger.exception("Error parsing Telnyx webhook message")
             return None
     
     async def get_message_status(self, message_id: str) -> Dict[str, Any]:
@@ -215,26 +229,24 @@ class TelnyxMessagingService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/messages/{message_id}",
-                    headers=headers,
-                    timeout=30.0
-                )
+            response = await self.client.get(
+                f"{self.base_url}/messages/{message_id}",
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                return {
+                    "success": True,
+                    "data": result.get("data", {})
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"API error: {response.status_code}",
+                    "details": response.text
+                }
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    return {
-                        "success": True,
-                        "data": result.get("data", {})
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"API error: {response.status_code}",
-                        "details": response.text
-                    }
-                    
         except Exception as e:
             logger.error(f"Error getting message status: {e}")
             return {"success": False, "error": "Internal error"}
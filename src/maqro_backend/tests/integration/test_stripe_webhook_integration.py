@@ -0,0 +1,107 @@
+"""
+Stripe webhook statements run against a real Postgres.
+
+Set TEST_DATABASE_URL (postgresql+asyncpg://...) to run; the tables are
+created in a throwaway schema inside a transaction that is rolled back.
+"""
+import os
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from maqro_backend.db.models import Base, Dealership, DealershipSubscription, SubscriptionEvent, SubscriptionPlan
+from maqro_backend.services.stripe_event_service import _CREATE_CHECKOUT_SUBSCRIPTION, _MARK_PAST_DUE_AND_LOG
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+_TABLES = [t.__table__ for t in (Dealership, SubscriptionPlan, DealershipSubscription, SubscriptionEvent)]
+
+
+@pytest_asyncio.fixture
+async def conn():
+    engine = create_async_engine(TEST_DATABASE_URL)
+    schema = f"stripe_test_{uuid.uuid4().hex[:8]}"
+    async with engine.connect() as connection:
+        await connection.execute(text(f"CREATE SCHEMA {schema}"))
+        await connection.execute(text(f"SET search_path TO {schema}"))
+        # Supabase ships uuid-ossp; a bare Postgres may not
+        await connection.execute(text(
+            "CREATE FUNCTION uuid_generate_v4() RETURNS uuid LANGUAGE sql AS 'SELECT gen_random_uuid()'"
+        ))
+        await connection.run_sync(Base.metadata.create_all, tables=_TABLES)
+        try:
+            yield connection
+        finally:
+            # Everything, schema included, lives in this one uncommitted transaction
+            await connection.rollback()
+    await engine.dispose()
+
+
+async def _seed(conn):
+    dealership_id = (await conn.execute(
+        text("INSERT INTO dealerships (name) VALUES ('Test Motors') RETURNING id")
+    )).scalar_one()
+    plan_id = (await conn.execute(
+        text("INSERT INTO subscription_plans (stripe_product_id, name, monthly_price_cents) VALUES ('prod_1', 'Basic', 50000) RETURNING id")
+    )).scalar_one()
+    return dealership_id, plan_id
+
+
+def _checkout_params(dealership_id, plan_id, stripe_event_id):
+    return {
+        "dealership_id": dealership_id,
+        "subscription_plan_id": plan_id,
+        "stripe_subscription_id": "sub_123",
+        "stripe_customer_id": "cus_123",
+        "status": "active",
+        "current_period_start": None,
+        "current_period_end": None,
+        "event_type": "created",
+        "stripe_event_id": stripe_event_id,
+        "event_data": {"tier": "basic"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_checkout_redelivery_keeps_current_subscription(conn):
+    dealership_id, plan_id = await _seed(conn)
+
+    first = await conn.execute(_CREATE_CHECKOUT_SUBSCRIPTION, _checkout_params(dealership_id, plan_id, "evt_1"))
+    subscription_id = first.scalar_one()
+
+    # Same subscription again (concurrent delivery or a reused subscription id)
+    second = await conn.execute(_CREATE_CHECKOUT_SUBSCRIPTION, _checkout_params(dealership_id, plan_id, "evt_2"))
+    assert second.scalar_one_or_none() is None
+
+    current = (await conn.execute(
+        text("SELECT current_subscription_id FROM dealerships WHERE id = :id"), {"id": dealership_id}
+    )).scalar_one()
+    assert current == subscription_id
+
+
+@pytest.mark.asyncio
+async def test_payment_failed_marks_past_due_and_logs_event(conn):
+    dealership_id, plan_id = await _seed(conn)
+    await conn.execute(_CREATE_CHECKOUT_SUBSCRIPTION, _checkout_params(dealership_id, plan_id, "evt_1"))
+
+    # Handlers run on a Session, whose ORM insert handling differs from a bare connection
+    session = AsyncSession(bind=conn)
+    await session.execute(_MARK_PAST_DUE_AND_LOG, {
+        "stripe_id": "sub_123",
+        "event_type": "payment_failed",
+        "stripe_event_id": "evt_2",
+        "event_data": {"amount_due": 100, "currency": "usd"},
+    })
+    await session.flush()
+
+    status = (await conn.execute(text("SELECT status FROM dealership_subscriptions"))).scalar_one()
+    logged = (await conn.execute(
+        text("SELECT event_type FROM subscription_events WHERE stripe_event_id = 'evt_2'")
+    )).scalar_one()
+    assert status == "past_due"
+    assert logged == "payment_failed"
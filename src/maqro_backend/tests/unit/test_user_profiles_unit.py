@@ -0,0 +1,111 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from maqro_backend.main import app
+from maqro_backend.api.deps import get_current_user_id, get_current_user_profile, get_db_session
+from maqro_backend.db.models import UserProfile
+from maqro_backend.services.profile_cache import user_profile_cache
+from maqro_backend.api.routes.user_profiles import _to_profile_response
+from maqro_backend.schemas.user_profile import UserProfileResponse
+
+client = TestClient(app)
+
+
+def _fake_profile(**overrides):
+    fields = dict(
+        id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        dealership_id=uuid.uuid4(),
+        full_name="Test User",
+        phone="+15555550100",
+        role="salesperson",
+        timezone="America/New_York",
+        created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        updated_at=datetime(2025, 1, 2, tzinfo=timezone.utc),
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+# --- _to_profile_response skips validation, so it must match what validation produces ---
+def test_profile_response_matches_validated_model():
+    profile = _fake_profile()
+
+    constructed = _to_profile_response(profile)
+
+    assert constructed.model_dump() == UserProfileResponse.model_validate(profile).model_dump()
+
+
+def test_profile_response_without_dealership():
+    profile = _fake_profile(dealership_id=None)
+
+    constructed = _to_profile_response(profile)
+
+    assert constructed.dealership_id is None
+    assert constructed.model_dump() == UserProfileResponse.model_validate(profile).model_dump()
+
+
+# --- GET /api/user-profiles/me ---
+def test_get_my_profile_serializes_ids_as_strings():
+    profile = _fake_profile()
+    app.dependency_overrides[get_current_user_profile] = lambda: profile
+
+    response = client.get("/api/user-profiles/me")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["id"] == str(profile.id)
+    assert body["user_id"] == str(profile.user_id)
+    assert body["dealership_id"] == str(profile.dealership_id)
+
+    app.dependency_overrides = {}
+
+
+# --- Cached profiles must outlive the session that loaded them ---
+def test_denied_request_does_not_break_cached_profile(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'profiles.db'}", poolclass=NullPool)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    user_id = uuid.uuid4()
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: UserProfile.__table__.create(sync_conn))
+            await conn.execute(insert(UserProfile.__table__).values(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                dealership_id=uuid.uuid4(),
+                full_name="Sales Person",
+                role="salesperson",
+                timezone="America/New_York",
+            ))
+
+    async def override_db():
+        # Same contract as get_db: roll back when the request raises
+        async with session_factory() as session:
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
+
+    asyncio.run(setup())
+    user_profile_cache.clear()
+    app.dependency_overrides[get_current_user_id] = lambda: str(user_id)
+    app.dependency_overrides[get_db_session] = override_db
+    try:
+        denied = client.get("/api/invites")
+        assert denied.status_code == 403
+
+        response = client.get("/api/user-profiles/me")
+        assert response.status_code == 200
+        assert response.json()["role"] == "salesperson"
+    finally:
+        app.dependency_overrides = {}
+        user_profile_cache.clear()
+        asyncio.run(engine.dispose())
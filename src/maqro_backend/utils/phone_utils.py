@@ -8,8 +8,11 @@ This module provides a single standard for phone number normalization:
 - Lookup: Exact match on normalized format
 """
 import re
+from functools import lru_cache
 from typing import Optional
 
+_NON_DIGITS = re.compile(r'[^\d]')
+
 
 def normalize_phone_number(phone: str) -> Optional[str]:
     """
@@ -27,9 +30,14 @@ def normalize_phone_number(phone: str) -> Optional[str]:
     """
     if not phone or not isinstance(phone, str):
         return None
-    
+    return _normalize_phone_str(phone)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_phone_str(phone: str) -> Optional[str]:
+    """Cached body of normalize_phone_number; the same numbers recur on every message."""
     # Remove all non-digit characters
-    digits_only = re.sub(r'[^\d]', '', phone)
+    digits_only = _NON_DIGITS.sub('', phone)
     
     if not digits_only:
         return None
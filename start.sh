@@ -11,4 +11,4 @@ echo "Listing src directory:"
 ls -la src/
 
 # Start the FastAPI application
-exec uvicorn src.maqro_backend.main:app --host 0.0.0.0 --port $PORT 
\ No newline at end of file
+exec uvicorn src.maqro_backend.main:app --host 0.0.0.0 --port $PORT --loop uvloop --http httptools 
\ No newline at end of file